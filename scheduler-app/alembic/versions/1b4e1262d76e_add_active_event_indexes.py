@@ -0,0 +1,56 @@
+"""Add partial indexes on active events and event_participants primary key
+
+Revision ID: 1b4e1262d76e
+Revises: c3ffc088c8cd
+Create Date: 2026-10-17 14:02:37.915264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b4e1262d76e'
+down_revision: Union[str, Sequence[str], None] = 'c3ffc088c8cd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_SINGLE = "status = 'active' AND recurrence IS NULL"
+ACTIVE_SERIES = "status = 'active' AND recurrence IS NOT NULL"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the association table never had a key: drop broken and duplicate links first
+    op.execute("DELETE FROM event_participants WHERE user_id IS NULL OR event_id IS NULL")
+    op.execute(
+        "DELETE FROM event_participants a USING event_participants b "
+        "WHERE a.ctid < b.ctid AND a.user_id = b.user_id AND a.event_id = b.event_id"
+    )
+    op.alter_column('event_participants', 'user_id', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('event_participants', 'event_id', existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key('event_participants_pkey', 'event_participants', ['user_id', 'event_id'])
+    # the primary key covers (user_id, event_id) lookups
+    op.drop_index('ix_event_participants_user_id_event_id', table_name='event_participants')
+    op.create_index('ix_event_participants_event_id', 'event_participants', ['event_id'], unique=False)
+
+    op.create_index('ix_events_active_user_id_start_time', 'events', ['user_id', 'start_time', 'end_time'], unique=False, postgresql_include=['id'], postgresql_where=sa.text(ACTIVE_SINGLE))
+    op.create_index('ix_events_active_user_id_during', 'events', ['user_id', 'during'], unique=False, postgresql_using='gist', postgresql_where=sa.text(ACTIVE_SINGLE))
+    op.drop_index('ix_events_series', table_name='events', postgresql_where=sa.text('recurrence IS NOT NULL'))
+    op.create_index('ix_events_series', 'events', ['user_id', 'start_time'], unique=False, postgresql_where=sa.text(ACTIVE_SERIES))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_events_series', table_name='events', postgresql_where=sa.text(ACTIVE_SERIES))
+    op.create_index('ix_events_series', 'events', ['user_id', 'start_time'], unique=False, postgresql_where=sa.text('recurrence IS NOT NULL'))
+    op.drop_index('ix_events_active_user_id_during', table_name='events', postgresql_using='gist', postgresql_where=sa.text(ACTIVE_SINGLE))
+    op.drop_index('ix_events_active_user_id_start_time', table_name='events', postgresql_include=['id'], postgresql_where=sa.text(ACTIVE_SINGLE))
+
+    op.drop_index('ix_event_participants_event_id', table_name='event_participants')
+    op.create_index('ix_event_participants_user_id_event_id', 'event_participants', ['user_id', 'event_id'], unique=False)
+    op.drop_constraint('event_participants_pkey', 'event_participants', type_='primary')
+    op.alter_column('event_participants', 'event_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('event_participants', 'user_id', existing_type=sa.Integer(), nullable=True)
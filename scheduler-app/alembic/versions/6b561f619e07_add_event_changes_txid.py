@@ -0,0 +1,38 @@
+"""Key the event change log by committing transaction
+
+Revision ID: 6b561f619e07
+Revises: 1b4e1262d76e
+Create Date: 2026-10-17 15:12:08.441390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b561f619e07'
+down_revision: Union[str, Sequence[str], None] = '1b4e1262d76e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CURRENT_TXID = "(pg_current_xact_id()::text::bigint)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows get this migration's txid: any older cursor resends them
+    # once instead of skipping them (the dashboard takes a fresh cursor on load)
+    op.add_column('event_changes', sa.Column('txid', sa.BigInteger(), nullable=True))
+    op.execute(f"UPDATE event_changes SET txid = {CURRENT_TXID}")
+    op.alter_column('event_changes', 'txid', existing_type=sa.BigInteger(), nullable=False, server_default=sa.text(CURRENT_TXID))
+    op.create_index('ix_event_changes_user_id_txid', 'event_changes', ['user_id', 'txid'], unique=False)
+    op.drop_index('ix_event_changes_user_id_id', table_name='event_changes')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_event_changes_user_id_id', 'event_changes', ['user_id', 'id'], unique=False)
+    op.drop_index('ix_event_changes_user_id_txid', table_name='event_changes')
+    op.drop_column('event_changes', 'txid')
@@ -0,0 +1,84 @@
+"""Add event time ranges and per-participant busy table
+
+Revision ID: c0489257a827
+Revises: 360ad8dd8a4e
+Create Date: 2026-10-17 09:12:41.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0489257a827'
+down_revision: Union[str, Sequence[str], None] = '360ad8dd8a4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # needed for "user_id WITH =" inside a GiST exclusion constraint
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    # tstzrange() raises on reversed bounds: legacy rows entered the wrong
+    # way round are swapped so the generated column can be added
+    op.execute("""
+        UPDATE events SET start_time = end_time, end_time = start_time
+        WHERE end_time < start_time
+    """)
+
+    op.add_column('events', sa.Column(
+        'during',
+        postgresql.TSTZRANGE(),
+        sa.Computed(
+            "tstzrange(start_time AT TIME ZONE 'UTC', end_time AT TIME ZONE 'UTC', '[)')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_events_during', 'events', ['during'], unique=False, postgresql_using='gist')
+
+    op.create_table('event_busy',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('during', postgresql.TSTZRANGE(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id', 'user_id'),
+    postgresql.ExcludeConstraint(
+        (sa.column('user_id'), '='),
+        (sa.column('during'), '&&'),
+        name='event_busy_no_overlap',
+        using='gist',
+    ),
+    )
+
+    # Backfill regular users' active events. Rows that already overlap
+    # (legacy double bookings) are skipped instead of failing the upgrade.
+    op.execute("""
+        INSERT INTO event_busy (event_id, user_id, during)
+        SELECT e.id, busy.user_id, e.during
+        FROM events e
+        JOIN (
+            SELECT id AS event_id, user_id FROM events
+            UNION
+            SELECT event_id, user_id FROM event_participants
+        ) busy ON busy.event_id = e.id
+        JOIN users u ON u.id = busy.user_id
+        LEFT JOIN roles r ON r.id = u.role_id
+        WHERE e.status = 'active'
+          AND (r.name IS NULL OR r.name = 'user')
+        ORDER BY e.start_time, e.id
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('event_busy')
+    op.drop_index('ix_events_during', table_name='events', postgresql_using='gist')
+    op.drop_column('events', 'during')
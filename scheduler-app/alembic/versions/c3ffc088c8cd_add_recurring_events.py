@@ -0,0 +1,43 @@
+"""Add recurring events and occurrence exceptions
+
+Revision ID: c3ffc088c8cd
+Revises: a5c5f1989251
+Create Date: 2026-10-17 13:21:44.208317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3ffc088c8cd'
+down_revision: Union[str, Sequence[str], None] = 'a5c5f1989251'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('recurrence', sa.String(), nullable=True))
+    op.add_column('events', sa.Column('series_end', sa.DateTime(), nullable=True))
+    op.create_index('ix_events_series', 'events', ['user_id', 'start_time'], unique=False, postgresql_where=sa.text('recurrence IS NOT NULL'))
+    op.create_table('event_exceptions',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('occurrence_start', sa.DateTime(), nullable=False),
+    sa.Column('cancelled', sa.Boolean(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id', 'occurrence_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('event_exceptions')
+    op.drop_index('ix_events_series', table_name='events', postgresql_where=sa.text('recurrence IS NOT NULL'))
+    op.drop_column('events', 'series_end')
+    op.drop_column('events', 'recurrence')
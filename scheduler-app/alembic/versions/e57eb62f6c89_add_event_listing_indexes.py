@@ -0,0 +1,32 @@
+"""Add indexes for windowed event listing
+
+Revision ID: e57eb62f6c89
+Revises: c0489257a827
+Create Date: 2026-10-17 10:03:17.884310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e57eb62f6c89'
+down_revision: Union[str, Sequence[str], None] = 'c0489257a827'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # owned events, walked in keyset order (start_time, id)
+    op.create_index('ix_events_user_id_start_time_id', 'events', ['user_id', 'start_time', 'id'], unique=False)
+    # joined events: participant -> event ids
+    op.create_index('ix_event_participants_user_id_event_id', 'event_participants', ['user_id', 'event_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_participants_user_id_event_id', table_name='event_participants')
+    op.drop_index('ix_events_user_id_start_time_id', table_name='events')
@@ -6,11 +6,13 @@ from dotenv import load_dotenv
 import os
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
 from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 
 from app import models
-from app.database import get_db
+from app.database import get_db, read_db
+from app.utils import cache
+from app.utils.metrics import counter, timed
 
 load_dotenv()
 
@@ -22,6 +24,9 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+principal_hits = counter("principal_cache_hits_total", "Users resolved from the principal cache")
+principal_misses = counter("principal_cache_misses_total", "Users loaded from the database")
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -49,21 +54,64 @@ def decode_access_token(token: str):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
-    payload = decode_access_token(token)
-    user_id = payload.get("sub")
-
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Token missing subject")
-
-    try:
-        user_id = int(user_id)
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid token subject")
-
+# ---------- principal cache ----------
+# A JSON-safe snapshot of the user + role + permissions. The password hash
+# is left out on purpose; it lazy-loads on the rare paths that need it.
+
+def _principal_snapshot(user: models.User) -> dict:
+    role = user.role
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "mobile": user.mobile,
+        "role_id": user.role_id,
+        "role": role and {
+            "id": role.id,
+            "name": role.name,
+            "permissions": [
+                {"id": p.id, "key": p.key, "description": p.description}
+                for p in role.permissions
+            ],
+        },
+    }
+
+
+def _principal_from_snapshot(db: Session, snapshot: dict) -> models.User:
+    """
+    Rebuild the user as a persistent object of `db` without any SQL.
+    """
+    snapshot = dict(snapshot)
+    role_data = snapshot.pop("role")
+
+    role = None
+    objects = []
+    if role_data:
+        permissions = [models.Permission(**p) for p in role_data["permissions"]]
+        role = models.Role(id=role_data["id"], name=role_data["name"])
+        role.permissions = permissions
+        objects += [role, *permissions]
+
+    user = models.User(**snapshot, role=role)
+    for obj in [user, *objects]:
+        make_transient_to_detached(obj)
+    return db.merge(user, load=False)
+
+
+def _load_principal(db: Session, user_id: int) -> models.User:
+    # Role and permissions are authorization data: a demotion must take
+    # effect on every worker at once. They are only cached when the version
+    # bump is seen by all of them (shared backend, or a single worker);
+    # otherwise every request reads them from the database.
+    cache_key = None
+    if cache.versions_shared:
+        cache_key = f"principal:{user_id}:{cache.principal_version(user_id)}"
+        snapshot = cache.backend.get(cache_key)
+        if snapshot is not None:
+            principal_hits.inc()
+            return _principal_from_snapshot(db, snapshot)
+
+    principal_misses.inc()
     user = (
         db.query(models.User)
         .options(joinedload(models.User.role).joinedload(models.Role.permissions))
@@ -74,4 +122,36 @@ def get_current_user(
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    if cache_key:
+        cache.backend.set(cache_key, _principal_snapshot(user))
     return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    with timed("auth"):
+        payload = decode_access_token(token)
+        user_id = payload.get("sub")
+
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Token missing subject")
+
+        try:
+            user_id = int(user_id)
+        except ValueError:
+            raise HTTPException(status_code=401, detail="Invalid token subject")
+
+        # lets the session route this user's reads (read-your-writes pinning)
+        db.info["user_id"] = user_id
+        return await read_db(db, _load_principal, user_id)
+
+
+async def get_current_admin(current_user: models.User = Depends(get_current_user)):
+    """
+    Admins and super admins only (operational endpoints such as /metrics).
+    """
+    if not current_user.role or current_user.role.name not in ["admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
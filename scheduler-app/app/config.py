@@ -7,3 +7,83 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+# Seconds a user's cached busy intervals stay valid before being reloaded
+BUSY_INDEX_TTL_SECONDS = int(os.getenv("BUSY_INDEX_TTL_SECONDS", 300))
+
+# Optional redis:// URL so real-time pushes reach sockets on every worker.
+# Unset = in-process broker (single worker / tests).
+REALTIME_BROKER_URL = os.getenv("REALTIME_BROKER_URL")
+
+# Response cache for GET /events/. Unset CACHE_URL = in-process LRU;
+# a redis:// URL shares the cache between workers.
+CACHE_URL = os.getenv("CACHE_URL")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 300))
+# Worker processes serving the app (uvicorn and gunicorn read the same
+# variable; set it rather than --workers). The in-process LRU only sees its
+# own worker's writes, so with more than one worker the version-keyed
+# caches (cached pages, ETags, principals) are off unless CACHE_URL is shared.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+# DB_ASYNC=true: asyncpg engine + AsyncSession; routes then await their
+# database work on the event loop instead of holding a threadpool worker
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Read replicas (comma-separated full URLs). Read-only work is spread over
+# them round-robin; a replica that fails is skipped for REPLICA_RETRY_SECONDS.
+# Requires CACHE_URL: read-your-writes pins must be visible to every worker.
+DB_REPLICA_URLS = [u.strip() for u in os.getenv("DB_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_RETRY_SECONDS = int(os.getenv("REPLICA_RETRY_SECONDS", 30))
+# After a write, affected users read from the primary this long (replica lag)
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
+# Connection pool, per engine and per uvicorn worker: size the total
+# (workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)) below Postgres max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Per-request SQL accounting: routes may declare their own budget; over-budget
+# requests are logged, or raise when strict (use strict in tests/CI)
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", 20))
+SQL_QUERY_BUDGET_STRICT = os.getenv("SQL_QUERY_BUDGET_STRICT", "false").lower() in ("1", "true", "yes")
+# the same statement this many times in one request is logged as a likely N+1
+SQL_REPEAT_WARNING = int(os.getenv("SQL_REPEAT_WARNING", 3))
+
+# Outgoing email. EMAIL_BACKEND: smtp | console (print) | memory (kept in
+# process, for tests). Mail is written to the email_outbox table in the
+# request's transaction and delivered by a background worker.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "smtp")
+# run the outbox worker in this process (disable on all but a few workers)
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() in ("1", "true", "yes")
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 5))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 50))
+# failed sends retry with exponential backoff; after the last attempt the
+# message is dead-lettered (status "dead") for inspection
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+
+# SMTP connection pool: authenticated connections are reused for many
+# messages; at most SMTP_MAX_CONNECTIONS are open per process
+SMTP_MAX_CONNECTIONS = int(os.getenv("SMTP_MAX_CONNECTIONS", 4))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+# idle connections older than this are closed rather than reused
+SMTP_IDLE_SECONDS = int(os.getenv("SMTP_IDLE_SECONDS", 60))
+
+# Event change notifications wait this long for further changes to the same
+# recipient, then go out as one email (a digest when there are several)
+NOTIFY_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", 60))
+
+# most events accepted by one POST /events/bulk request
+BULK_EVENTS_MAX = int(os.getenv("BULK_EVENTS_MAX", 5000))
+
+# POST /events/freebusy limits: users per request and window length
+FREEBUSY_MAX_USERS = int(os.getenv("FREEBUSY_MAX_USERS", 200))
+FREEBUSY_MAX_DAYS = int(os.getenv("FREEBUSY_MAX_DAYS", 92))
+
+# most meeting requests one POST /events/auto-schedule call may place
+AUTO_SCHEDULE_MAX_MEETINGS = int(os.getenv("AUTO_SCHEDULE_MAX_MEETINGS", 500))
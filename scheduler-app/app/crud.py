@@ -1,6 +1,10 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from sqlalchemy import insert, select, literal, text, tuple_, func, union, union_all
+from sqlalchemy.dialects.postgresql import Range, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime, timedelta, timezone
+import heapq
 from fastapi import HTTPException
 from jose import jwt
 from app.models import User
@@ -9,6 +13,12 @@ from app.auth import verify_password
 from . import models, schemas
 from app.auth import get_password_hash, verify_password
 from app.config import SECRET_KEY, ALGORITHM
+from app.utils.busy_index import UserIntervals, busy_index
+from app.utils.realtime import publish_event_change
+from app.utils import autoschedule, cache, outbox, recurrence, slots
+
+# first key of the per-user advisory locks taken by _lock_users
+_BUSY_LOCK_NAMESPACE = 7301
 
 # =====================================================
 # USER UTILITIES
@@ -19,19 +29,12 @@ def get_user_by_email(db: Session, email: str):
 
 def get_user_by_identifier(db: Session, identifier: str):
     return db.query(models.User).filter(
-        (models.User.email == identifier) | (models.User.phone == identifier)
+        (models.User.email == identifier) | (models.User.mobile == identifier)
     ).first()
 
 
 def authenticate_user(db, identifier: str, password: str):
-    user = (
-        db.query(User)
-        .filter(
-            (User.email == identifier) |
-            (User.mobile == identifier)
-        )
-        .first()
-    )
+    user = get_user_by_identifier(db, identifier)
 
     if not user:
         return None
@@ -55,6 +58,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     )
     db.add(db_user)
     db.commit()
+    cache.invalidate_directory()
     db.refresh(db_user)
     return db_user
 
@@ -72,6 +76,7 @@ def create_invited_user(db: Session, user: schemas.UserInvite):
     )
     db.add(db_user)
     db.commit()
+    cache.invalidate_directory()
     db.refresh(db_user)
     return db_user
 
@@ -80,19 +85,26 @@ def create_invited_user(db: Session, user: schemas.UserInvite):
 # EVENT CONFLICT LOGIC (THE IMPORTANT PART)
 # =====================================================
 
-def _has_overlap(db: Session, user_id: int, start: datetime, end: datetime) -> bool:
+def _has_overlap(
+    db: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    exclude_event_id: int = None,
+) -> bool:
     """
-    Checks if THIS USER already has an overlapping event
+    Checks if THIS USER already has an overlapping active event
     either as owner or participant.
+    Answered from the in-memory busy index (DB is only hit on a cold user).
     """
-    return db.query(models.Event).filter(
-        (
-            (models.Event.user_id == user_id)
-            | (models.Event.participants.any(models.User.id == user_id))
-        ),
-        models.Event.start_time < end,
-        models.Event.end_time > start,
-    ).first() is not None
+    return bool(busy_index.conflicts(db, user_id, start, end, exclude_event_id))
+
+
+def _event_user_ids(event: models.Event) -> set:
+    """
+    Owner + participants: everyone whose busy intervals include this event.
+    """
+    return {event.user_id} | {p.id for p in event.participants}
 
 
 def _is_regular_user(user: models.User) -> bool:
@@ -102,34 +114,372 @@ def _is_regular_user(user: models.User) -> bool:
     return not user.role or user.role.name == "user"
 
 
-def create_event(db: Session, event: schemas.EventCreate, owner_id: int):
+def _utc_range(start: datetime, end: datetime) -> Range:
     """
-    RULES:
-    - Conflict checks ONLY for role == 'user'
-    - Admin & Super Admin are ALWAYS ignored in conflicts
+    Naive UTC datetimes -> the [start, end) tstzrange stored in the DB.
+    end=None leaves the range unbounded.
+    """
+    return Range(
+        start.replace(tzinfo=timezone.utc),
+        end.replace(tzinfo=timezone.utc) if end else None,
+        bounds="[)",
+    )
+
+
+def _lock_users(db: Session, users: list):
+    """
+    Serialize writers per regular user until commit. The busy table's
+    exclusion constraint only covers single events, so this is what keeps
+    a recurring series and a concurrent write from double-booking someone.
+    """
+    user_ids = sorted({u.id for u in users if _is_regular_user(u)})
+    if user_ids:
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:ns, uid) FROM unnest(CAST(:ids AS integer[])) AS uid"),
+            {"ns": _BUSY_LOCK_NAMESPACE, "ids": user_ids},
+        )
+
+
+def _db_conflicts(
+    db: Session,
+    user_ids: list,
+    start: datetime,
+    end: datetime,
+    exclude_event_id: int = None,
+) -> dict:
+    """
+    Authoritative overlap lookup on event_busy (GiST: user_id, during).
+    The table only ever holds active single events (rows go on cancel),
+    so no status filter is needed.
+    Returns {user_id: [(start, end, event_id), ...]}.
+    """
+    query = (
+        db.query(
+            models.EventBusy.user_id,
+            models.Event.start_time,
+            models.Event.end_time,
+            models.Event.id,
+        )
+        .join(models.Event, models.Event.id == models.EventBusy.event_id)
+        .filter(
+            models.EventBusy.user_id.in_(user_ids),
+            models.EventBusy.during.overlaps(_utc_range(start, end)),
+        )
+    )
+    if exclude_event_id is not None:
+        query = query.filter(models.EventBusy.event_id != exclude_event_id)
+
+    result = {}
+    for user_id, s, e, event_id in query.all():
+        result.setdefault(user_id, []).append((s, e, event_id))
+    return result
+
+
+def _series(event: models.Event) -> recurrence.Series:
+    return recurrence.Series(
+        event.id,
+        event.start_time,
+        event.end_time,
+        recurrence.parse_rule(event.recurrence),
+        event.exceptions,
+    )
+
+
+def _active_series(
+    db: Session,
+    user_ids,
+    start: datetime,
+    end: datetime = None,
+    exclude_event_id: int = None,
+) -> list:
+    """
+    Active recurring events of `user_ids` whose span meets [start, end)
+    (end=None: unbounded), as [(event, the user_ids it involves)].
+    Cost follows the number of series, not of occurrences.
+    """
+    user_ids = set(user_ids)
+    # a UNION rather than "owner OR participant" so each branch uses its index
+    # (ix_events_series / the event_participants primary key)
+    series_ids = union_all(
+        select(models.Event.id).where(
+            models.Event.user_id.in_(list(user_ids)), models.active_series
+        ),
+        select(models.event_participants.c.event_id)
+        .join(models.Event, models.Event.id == models.event_participants.c.event_id)
+        .where(
+            models.event_participants.c.user_id.in_(list(user_ids)), models.active_series
+        ),
+    )
+    query = (
+        db.query(models.Event)
+        .options(selectinload(models.Event.participants), selectinload(models.Event.exceptions))
+        .filter(
+            models.Event.id.in_(series_ids),
+            models.active_series,
+            (models.Event.series_end.is_(None)) | (models.Event.series_end > start),
+        )
+    )
+    if end is not None:
+        query = query.filter(models.Event.start_time < end)
+    if exclude_event_id is not None:
+        query = query.filter(models.Event.id != exclude_event_id)
+    return [(event, _event_user_ids(event) & user_ids) for event in query.all()]
+
+
+def _series_busy(
+    db: Session,
+    user_ids,
+    start: datetime,
+    end: datetime,
+    exclude_event_id: int = None,
+) -> dict:
+    """
+    Occurrences of recurring events inside [start, end), expanded per rule.
+    Returns {user_id: [(start, end, event_id), ...]} like _db_conflicts.
+    """
+    result = {}
+    for event, involved in _active_series(db, user_ids, start, end, exclude_event_id):
+        for _, s, e, _ in _series(event).occurrences(start, end):
+            for user_id in involved:
+                result.setdefault(user_id, []).append((s, e, event.id))
+    return result
+
+
+def _format_conflicts(users_by_id: dict, busy: dict) -> list:
+    return [
+        {
+            "user_id": user_id,
+            "name": users_by_id[user_id].name,
+            "events": [
+                {
+                    "id": event_id,
+                    "start_time": s.isoformat(),
+                    "end_time": e.isoformat(),
+                }
+                for s, e, event_id in sorted(intervals)
+            ],
+        }
+        for user_id, intervals in sorted(busy.items())
+    ]
+
+
+def find_conflicts(
+    db: Session,
+    users: list,
+    start: datetime,
+    end: datetime,
+    exclude_event_id: int = None,
+) -> list:
+    """
+    Checks ALL given users at once (one grouped load at most) and returns
+    every user that is busy, with the events they collide with.
+    Non-regular users are skipped.
+    """
+    regular = {u.id: u for u in users if _is_regular_user(u)}
+    if not regular:
+        return []
+
+    busy = busy_index.conflicts_many(db, regular.keys(), start, end, exclude_event_id)
+
+    if busy:
+        # The index can lag behind other workers; the database has the final word
+        confirmed = _db_conflicts(db, list(busy), start, end, exclude_event_id)
+        stale = [
+            user_id for user_id, intervals in busy.items()
+            if sorted(intervals) != sorted(confirmed.get(user_id, []))
+        ]
+        busy_index.forget(stale)
+        busy = confirmed
+
+    # recurring events aren't in the index or the busy table
+    for user_id, intervals in _series_busy(db, regular, start, end, exclude_event_id).items():
+        busy.setdefault(user_id, []).extend(intervals)
+
+    return _format_conflicts(regular, busy)
+
+
+def find_series_conflicts(
+    db: Session,
+    users: list,
+    series: recurrence.Series,
+    exclude_event_id: int = None,
+) -> list:
+    """
+    find_conflicts for a recurring event: every single event in the
+    series' span is tested against the rule, and every other series by
+    comparing one common cycle of both rules.
+    """
+    regular = {u.id: u for u in users if _is_regular_user(u)}
+    if not regular:
+        return []
+
+    begin = min([series.start, *(s for s, _, _ in series.moved.values())])
+    busy = {}
+    singles = _db_conflicts(db, list(regular), begin, series.end, exclude_event_id)
+    for user_id, intervals in singles.items():
+        hits = [(s, e, event_id) for s, e, event_id in intervals if series.occurrences(s, e)]
+        if hits:
+            busy[user_id] = hits
+
+    for other, involved in _active_series(db, regular, begin, series.end, exclude_event_id):
+        clash = recurrence.first_clash(series, _series(other))
+        if clash:
+            for user_id in involved:
+                busy.setdefault(user_id, []).append((*clash, other.id))
+
+    return _format_conflicts(regular, busy)
+
+
+def _add_busy_rows(db: Session, db_event: models.Event, users: list):
+    """
+    Reserve the event's slot for every regular user (flushed with the event).
+    """
+    during = _utc_range(db_event.start_time, db_event.end_time)
+    for user_id in {u.id for u in users if _is_regular_user(u)}:
+        db.add(models.EventBusy(event_id=db_event.id, user_id=user_id, during=during))
+
+
+def _delete_busy_rows(db: Session, event_id: int):
+    db.query(models.EventBusy).filter(
+        models.EventBusy.event_id == event_id
+    ).delete(synchronize_session=False)
+
+
+def sync_user_busy_rows(db: Session, user: models.User):
+    """
+    Re-derive a user's busy rows after a role change (caller commits).
+    Legacy overlaps are skipped rather than failing the role change.
+    """
+    db.query(models.EventBusy).filter(
+        models.EventBusy.user_id == user.id
+    ).delete(synchronize_session=False)
+
+    if not _is_regular_user(user):
+        return
+
+    rows = (
+        select(models.Event.id, literal(user.id), models.Event.during)
+        .where(
+            models.active_single_event,
+            models.Event.id.in_(_user_event_ids(user.id)),
+        )
+        .order_by(models.Event.start_time, models.Event.id)
+    )
+    db.execute(
+        pg_insert(models.EventBusy)
+        .from_select(["event_id", "user_id", "during"], rows)
+        .on_conflict_do_nothing()
+    )
+
+
+def _log_changes(db: Session, event_id: int, action: str, user_ids):
+    """
+    Append change-log rows for everyone affected (committed with the write).
+    """
+    for user_id in user_ids:
+        db.add(models.EventChange(event_id=event_id, user_id=user_id, action=action))
+
+
+def _is_exclusion_violation(exc: IntegrityError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code == "23P01"
+
+
+def _commit_or_conflict(
+    db: Session,
+    users: list,
+    start: datetime,
+    end: datetime,
+    current_user_id: int,
+    suffix: str,
+    exclude_event_id: int = None,
+):
     """
+    Commit; if a concurrent writer took the slot first, the exclusion
+    constraint rejects us and we answer with the usual conflict error.
+    """
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if not _is_exclusion_violation(exc):
+            raise
+        regular = {u.id: u for u in users if _is_regular_user(u)}
+        busy = _db_conflicts(db, list(regular), start, end, exclude_event_id)
+        busy_index.forget(list(regular))
+        _raise_conflicts(_format_conflicts(regular, busy), current_user_id, suffix)
 
-    owner = db.query(models.User).filter(models.User.id == owner_id).first()
-    if not owner:
-        raise HTTPException(status_code=404, detail="Owner not found")
 
-    # 1️⃣ OWNER CONFLICT CHECK (ONLY IF REGULAR USER)
-    if _is_regular_user(owner):
-        if _has_overlap(db, owner.id, event.start_time, event.end_time):
-            raise HTTPException(
-                status_code=400,
-                detail="Conflict: You already have an event at this time",
+def _raise_conflicts(conflicts: list, current_user_id: int, suffix: str):
+    names = ["You" if c["user_id"] == current_user_id else c["name"] for c in conflicts]
+    verb = "has" if len(names) == 1 and names[0] != "You" else "have"
+    if not names:
+        names, verb = ["Someone"], "has"
+    raise HTTPException(
+        status_code=400,
+        detail={
+            "message": f"Conflict: {', '.join(names)} already {verb} {suffix}",
+            "conflicts": conflicts,
+        },
+    )
+
+
+def _check_slot(
+    db: Session,
+    users: list,
+    event: schemas.EventCreate,
+    current_user_id: int,
+    suffix: str,
+    exclude_event_id: int = None,
+    exceptions=(),
+):
+    """
+    Lock the regular users, then raise if `event` (single or recurring)
+    collides with anything they have. Returns the Series of a recurring
+    event, None otherwise.
+    """
+    _lock_users(db, users)
+    series = None
+    if event.recurrence:
+        try:
+            series = recurrence.Series(
+                exclude_event_id,
+                event.start_time,
+                event.end_time,
+                recurrence.parse_rule(event.recurrence),
+                exceptions,
             )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        conflicts = find_series_conflicts(db, users, series, exclude_event_id)
+    else:
+        conflicts = find_conflicts(
+            db, users, event.start_time, event.end_time, exclude_event_id
+        )
+    if conflicts:
+        _raise_conflicts(conflicts, current_user_id, suffix)
+    return series
+
+
+def create_event(db: Session, event: schemas.EventCreate, owner: models.User):
+    """
+    RULES:
+    - Conflict checks ONLY for role == 'user'
+    - Admin & Super Admin are ALWAYS ignored in conflicts
+    `owner` is the already-authenticated user (no re-query).
+    """
 
-    # 2️⃣ CREATE EVENT OBJECT
+    # 1️⃣ CREATE EVENT OBJECT
     db_event = models.Event(
         title=event.title,
         start_time=event.start_time,
         end_time=event.end_time,
         user_id=owner.id,
+        recurrence=event.recurrence,
     )
 
-    # 3️⃣ PARTICIPANT CONFLICT CHECK (ONLY REGULAR USERS)
+    participants = []
     if event.participants:
         participants = (
             db.query(models.User)
@@ -137,22 +487,304 @@ def create_event(db: Session, event: schemas.EventCreate, owner_id: int):
             .all()
         )
 
-        for p in participants:
-            if _is_regular_user(p):
-                if _has_overlap(db, p.id, event.start_time, event.end_time):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Conflict: {p.name} already has an event at this time",
-                    )
+    # 2️⃣ OWNER + PARTICIPANT CONFLICT CHECK (ONLY REGULAR USERS, ONE PASS)
+    series = _check_slot(db, [owner, *participants], event, owner.id, "an event at this time")
+    if series:
+        db_event.series_end = series.end
 
-        db_event.participants.extend(participants)
+    db_event.participants.extend(participants)
 
-    # 4️⃣ SAVE
+    # 3️⃣ SAVE (event + busy rows in one transaction)
+    user_ids = _event_user_ids(db_event)
     db.add(db_event)
-    db.commit()
+    db.flush()
+    if not series:
+        _add_busy_rows(db, db_event, [owner, *participants])
+    _log_changes(db, db_event.id, "created", user_ids)
+    _commit_or_conflict(
+        db,
+        [owner, *participants],
+        event.start_time,
+        event.end_time,
+        owner.id,
+        "an event at this time",
+    )
     db.refresh(db_event)
+
+    if not series:
+        busy_index.add_event(db_event, user_ids)
+    cache.invalidate_calendars(user_ids)
+    publish_event_change(user_ids, db_event.id, "created")
     return db_event
 
+
+def _batch_busy(db: Session, user_ids: list, start: datetime, end: datetime) -> dict:
+    """
+    Every busy interval of `user_ids` inside [start, end) (one query, plus
+    one per relation when recurring events are involved), as
+    {user_id: UserIntervals} ready for in-memory overlap checks.
+    """
+    entries = {user_id: UserIntervals(0) for user_id in user_ids}
+    if not user_ids:
+        return entries
+    for busy in (_db_conflicts(db, user_ids, start, end), _series_busy(db, user_ids, start, end)):
+        for user_id, intervals in busy.items():
+            # a series contributes one interval per occurrence, all under its id
+            spans = {}
+            for s, e, event_id in intervals:
+                spans.setdefault(event_id, []).append((s, e))
+            for event_id, event_spans in spans.items():
+                entries[user_id].set_event(event_id, event_spans)
+    return entries
+
+
+def _check_batch(items: list, owner: models.User, users_by_id: dict, busy: dict) -> list:
+    """
+    Accept items in order. An item is rejected if a regular user is busy in
+    the database or in an item accepted before it; accepted items then
+    block later ones. Batch items are keyed -(index + 1) in `busy` so they
+    never clash with event ids.
+    """
+    results = []
+    for index, item in enumerate(items):
+        if item.end_time <= item.start_time:
+            results.append({"index": index, "status": "invalid", "detail": "end_time must be after start_time"})
+            continue
+        if item.recurrence:
+            results.append({"index": index, "status": "invalid", "detail": "Create recurring events with POST /events/"})
+            continue
+        unknown = sorted(set(item.participants or []) - users_by_id.keys())
+        if unknown:
+            results.append({"index": index, "status": "invalid", "detail": f"Unknown participants: {unknown}"})
+            continue
+
+        users = [owner, *(users_by_id[uid] for uid in set(item.participants or []))]
+        regular = {u.id for u in users if _is_regular_user(u)}
+        clashes = {}
+        for user_id in regular:
+            overlapping = busy[user_id].overlapping(item.start_time, item.end_time)
+            if overlapping:
+                clashes[user_id] = overlapping
+        if clashes:
+            results.append({
+                "index": index,
+                "status": "conflict",
+                "detail": _format_batch_conflicts(users_by_id, owner, clashes),
+            })
+            continue
+
+        for user_id in regular:
+            busy[user_id].add(item.start_time, item.end_time, -(index + 1))
+        results.append({"index": index, "status": "created", "users": users, "regular": regular})
+    return results
+
+
+def _format_batch_conflicts(users_by_id: dict, owner: models.User, clashes: dict) -> list:
+    conflicts = _format_conflicts({**users_by_id, owner.id: owner}, clashes)
+    for conflict in conflicts:
+        for entry in conflict["events"]:
+            if entry["id"] < 0:
+                # collides with an earlier item of the same batch
+                entry["batch_index"] = -entry.pop("id") - 1
+    return conflicts
+
+
+def _load_users(db: Session, user_ids) -> dict:
+    """
+    {id: User} with roles loaded (for _is_regular_user), in one round trip.
+    """
+    if not user_ids:
+        return {}
+    return {
+        u.id: u
+        for u in db.query(models.User)
+        .options(selectinload(models.User.role))
+        .filter(models.User.id.in_(list(user_ids)))
+    }
+
+
+def create_events_bulk(
+    db: Session,
+    items: list,
+    owner: models.User,
+    atomic: bool = False,
+) -> list:
+    """
+    Create many events for `owner` in one transaction with a fixed number
+    of statements, whatever the batch size:
+    participants and their roles (2) + lock (1) + busy intervals (1) + multi-row
+    inserts for events, participant links, busy rows and change log (one
+    each, batched by the driver).
+
+    Items are checked against the database AND against earlier items of
+    the batch; rejected items are reported, the rest are created. With
+    `atomic`, one rejected item means nothing is created (409).
+    Returns one result per item: {"index", "status", "event_id" | "detail"}.
+    """
+    participant_ids = {uid for item in items for uid in (item.participants or [])}
+    users_by_id = _load_users(db, participant_ids)
+
+    regular_ids = {u.id for u in [owner, *users_by_id.values()] if _is_regular_user(u)}
+    _lock_users(db, [owner, *users_by_id.values()])
+    valid = [item for item in items if item.start_time < item.end_time and not item.recurrence]
+    busy = {user_id: UserIntervals(0) for user_id in regular_ids}
+    if valid:
+        busy = _batch_busy(
+            db,
+            list(regular_ids),
+            min(item.start_time for item in valid),
+            max(item.end_time for item in valid),
+        )
+
+    results = _check_batch(items, owner, users_by_id, busy)
+    accepted = [r for r in results if r["status"] == "created"]
+    if atomic and len(accepted) < len(results):
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Some events can no longer be created; nothing was saved",
+                "results": [r for r in results if r["status"] != "created"],
+            },
+        )
+    if not accepted:
+        return results
+
+    # RETURNING ids come back in parameter order, so they line up with `accepted`
+    event_ids = db.scalars(
+        insert(models.Event).returning(models.Event.id, sort_by_parameter_order=True),
+        [
+            {
+                "title": items[r["index"]].title,
+                "start_time": items[r["index"]].start_time,
+                "end_time": items[r["index"]].end_time,
+                "user_id": owner.id,
+                "status": "active",
+            }
+            for r in accepted
+        ],
+    ).all()
+
+    participant_rows, busy_rows, change_rows = [], [], []
+    for result, event_id in zip(accepted, event_ids):
+        item = items[result["index"]]
+        result["event_id"] = event_id
+        participant_rows += [
+            {"event_id": event_id, "user_id": uid} for uid in set(item.participants or [])
+        ]
+        during = _utc_range(item.start_time, item.end_time)
+        busy_rows += [
+            {"event_id": event_id, "user_id": uid, "during": during} for uid in result["regular"]
+        ]
+        change_rows += [
+            {"event_id": event_id, "user_id": u.id, "action": "created"}
+            for u in {u.id: u for u in result["users"]}.values()
+        ]
+
+    if participant_rows:
+        db.execute(insert(models.event_participants), participant_rows)
+    if busy_rows:
+        db.execute(insert(models.EventBusy), busy_rows)
+    db.execute(insert(models.EventChange), change_rows)
+
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if not _is_exclusion_violation(exc):
+            raise
+        # a concurrent writer booked one of these slots after our check:
+        # nothing was written, the caller can simply retry the batch
+        busy_index.forget(list(regular_ids))
+        raise HTTPException(
+            status_code=409,
+            detail="A concurrent change conflicts with this batch; nothing was created, please retry",
+        )
+
+    # rather than patching thousands of intervals in, reload lazily
+    touched = {u.id for r in accepted for u in r["users"]}
+    busy_index.forget(touched)
+    cache.invalidate_calendars(touched)
+    for result in accepted:
+        publish_event_change({u.id for u in result.pop("users")}, result["event_id"], "created")
+        del result["regular"]
+    return results
+
+
+def auto_schedule(
+    db: Session,
+    requests: list,
+    owner: models.User,
+    step: timedelta,
+    hours: slots.WorkingHours = None,
+    commit: bool = False,
+) -> list:
+    """
+    Place a set of meeting requests (schemas.MeetingRequest) without
+    conflicts; `owner` attends each, as with create_event. Everyone's
+    existing busy time is read once into interval indexes, then meetings
+    are placed greedily (see autoschedule.place_meetings).
+
+    With `commit`, placed meetings are created all-or-nothing through
+    create_events_bulk. Returns one result per request.
+    """
+    participant_ids = {uid for r in requests for uid in r.participants}
+    users_by_id = _load_users(db, participant_ids)
+    unknown = participant_ids - users_by_id.keys()
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown participants: {sorted(unknown)}")
+
+    regular_ids = {u.id for u in [owner, *users_by_id.values()] if _is_regular_user(u)}
+    if commit:
+        # hold the attendees until the bulk insert commits, so the plan stays valid
+        _lock_users(db, [owner, *users_by_id.values()])
+    busy = _batch_busy(
+        db,
+        list(regular_ids),
+        min(r.start for r in requests),
+        max(r.end for r in requests),
+    )
+
+    meetings = [
+        autoschedule.Meeting(
+            title=r.title,
+            user_ids=sorted({owner.id, *r.participants} & regular_ids),
+            duration=timedelta(minutes=r.duration_minutes),
+            start=r.start,
+            end=r.end,
+            priority=r.priority,
+        )
+        for r in requests
+    ]
+    placed = autoschedule.place_meetings(meetings, busy, step, hours)
+
+    results = [
+        {"index": i, "title": r.title, "status": "placed", "start_time": slot[0], "end_time": slot[1]}
+        if slot else
+        {"index": i, "title": r.title, "status": "unplaced", "detail": "No common free slot in the window"}
+        for i, (r, slot) in enumerate(zip(requests, placed))
+    ]
+
+    to_create = [res for res in results if res["status"] == "placed"]
+    if commit and to_create:
+        created = create_events_bulk(
+            db,
+            [
+                schemas.EventCreate(
+                    title=res["title"],
+                    start_time=res["start_time"],
+                    end_time=res["end_time"],
+                    participants=requests[res["index"]].participants,
+                )
+                for res in to_create
+            ],
+            owner,
+            atomic=True,
+        )
+        for res, outcome in zip(to_create, created):
+            res["event_id"] = outcome["event_id"]
+    return results
+
 def update_event(
     db: Session,
     event_id: int,
@@ -173,28 +805,11 @@ def update_event(
     if not (is_owner or is_admin):
         raise HTTPException(status_code=403, detail="Not allowed to edit this event")
 
-    # ---------- CONFLICT CHECK (EXCLUDE SELF) ----------
-    def has_overlap_excluding_self(user_id: int):
-        return db.query(models.Event).filter(
-            models.Event.id != event_id,  # 🔑 THIS IS CRITICAL
-            (
-                (models.Event.user_id == user_id)
-                | (models.Event.participants.any(models.User.id == user_id))
-            ),
-            models.Event.start_time < event.end_time,
-            models.Event.end_time > event.start_time,
-            models.Event.status == "active",
-        ).first() is not None
-
-    # Owner conflict
-    if current_user.role.name == "user":
-        if has_overlap_excluding_self(current_user.id):
-            raise HTTPException(
-                status_code=400,
-                detail="Conflict: You already have another event at this time",
-            )
+    if "recurrence" not in event.model_fields_set:
+        # a client that doesn't know about rules (or edits the title) must
+        # not turn a series into a single event: omitted means unchanged
+        event = event.model_copy(update={"recurrence": db_event.recurrence})
 
-    # Participants conflict
     participants = []
     if event.participants:
         participants = (
@@ -203,25 +818,362 @@ def update_event(
             .all()
         )
 
-        for p in participants:
-            if p.role.name == "user":
-                if has_overlap_excluding_self(p.id):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Conflict: {p.name} already has another event at this time",
-                    )
+    # Exceptions are keyed by the rule's occurrence starts: they only
+    # survive if neither the rule nor the first occurrence moved
+    keep_exceptions = (
+        event.recurrence == db_event.recurrence
+        and event.start_time == db_event.start_time
+        and event.end_time == db_event.end_time
+    )
+
+    # ---------- CONFLICT CHECK (EXCLUDE SELF) ----------
+    # Owner (if regular) + all regular participants, checked together
+    series = _check_slot(
+        db,
+        [db_event.owner, *participants],
+        event,
+        current_user.id,
+        "another event at this time",
+        exclude_event_id=event_id,
+        exceptions=db_event.exceptions if keep_exceptions else (),
+    )
 
     # ---------- UPDATE ----------
+    old_user_ids = _event_user_ids(db_event)
+
     db_event.title = event.title
     db_event.start_time = event.start_time
     db_event.end_time = event.end_time
+    db_event.recurrence = event.recurrence
+    db_event.series_end = series.end if series else None
+    if not keep_exceptions:
+        db_event.exceptions = []
     db_event.participants = participants
+    new_user_ids = _event_user_ids(db_event)
 
-    db.commit()
+    # Busy rows follow the event owner's and participants' new slot
+    _delete_busy_rows(db, db_event.id)
+    if not series:
+        _add_busy_rows(db, db_event, [db_event.owner, *participants])
+    _log_changes(db, db_event.id, "updated", new_user_ids)
+    _log_changes(db, db_event.id, "removed", old_user_ids - new_user_ids)
+    outbox.enqueue_event_notifications(db, db_event, "updated", new_user_ids, current_user)
+    outbox.enqueue_event_notifications(
+        db, db_event, "removed", old_user_ids - new_user_ids, current_user
+    )
+    _commit_or_conflict(
+        db,
+        [db_event.owner, *participants],
+        event.start_time,
+        event.end_time,
+        current_user.id,
+        "another event at this time",
+        exclude_event_id=event_id,
+    )
     db.refresh(db_event)
+
+    busy_index.remove_event(db_event.id, old_user_ids)
+    if not series:
+        busy_index.add_event(db_event, new_user_ids)
+    cache.invalidate_calendars(old_user_ids | new_user_ids)
+    publish_event_change(new_user_ids, db_event.id, "updated")
+    publish_event_change(old_user_ids - new_user_ids, db_event.id, "removed")
     return db_event
 
 
+def _user_event_ids(user_id: int):
+    """
+    Ids of the events a user owns or joined. A UNION of two index lookups:
+    `user_id = x OR id IN (...)` can use neither index and scans events.
+    """
+    return union(
+        select(models.Event.id).where(models.Event.user_id == user_id),
+        select(models.event_participants.c.event_id).where(
+            models.event_participants.c.user_id == user_id
+        ),
+    )
+
+
+def list_user_events(
+    db: Session,
+    user_id: int,
+    start: datetime = None,
+    end: datetime = None,
+    status: str = None,
+    after: tuple = None,
+    limit: int = None,
+):
+    """
+    Events the user owns or joined, ordered by (start_time, id).
+    - start/end: only events overlapping that window; with both given,
+      recurring events come back as their occurrences in the window
+      (otherwise a series is listed once, with its rule)
+    - after: keyset cursor (start_time, id) of the last row already seen
+    Returns (events, next_key); next_key is None on the last page.
+    """
+    event_ids = _user_event_ids(user_id)
+    query = (
+        db.query(models.Event)
+        .options(selectinload(models.Event.participants))
+        .filter(models.Event.id.in_(event_ids))
+    )
+
+    occurrences = []
+    if start and end:
+        query = query.filter(models.Event.recurrence.is_(None))
+        occurrences = _series_occurrences(db, event_ids, start, end, status, after)
+
+    if start and end:
+        query = query.filter(models.Event.during.overlaps(_utc_range(start, end)))
+    if end:
+        query = query.filter(models.Event.start_time < end)
+    if start:
+        query = query.filter(models.Event.end_time > start)
+    if status:
+        query = query.filter(models.Event.status == status)
+    if after:
+        query = query.filter(
+            tuple_(models.Event.start_time, models.Event.id) > tuple_(*after)
+        )
+
+    query = query.order_by(models.Event.start_time, models.Event.id)
+    if limit is None:
+        events = query.all()
+    else:
+        events = query.limit(limit + 1).all()
+
+    if occurrences:
+        events = sorted(events + occurrences, key=lambda e: (e.start_time, e.id))
+    if limit is None:
+        return events, None
+    if len(events) <= limit:
+        return events, None
+    events = events[:limit]
+    return events, (events[-1].start_time, events[-1].id)
+
+
+def _series_occurrences(
+    db: Session,
+    event_ids,
+    start: datetime,
+    end: datetime,
+    status: str = None,
+    after: tuple = None,
+) -> list:
+    """
+    The recurring events among `event_ids` (the user's, see
+    _user_event_ids) expanded inside [start, end), as
+    recurrence.Occurrence rows, after the keyset cursor if given.
+    """
+    query = (
+        db.query(models.Event)
+        .options(selectinload(models.Event.participants), selectinload(models.Event.exceptions))
+        .filter(
+            models.Event.id.in_(event_ids),
+            models.Event.recurrence.isnot(None),
+            models.Event.start_time < end,
+            (models.Event.series_end.is_(None)) | (models.Event.series_end > start),
+        )
+    )
+    if status:
+        query = query.filter(models.Event.status == status)
+
+    occurrences = []
+    for event in query.all():
+        for original, s, e, title in _series(event).occurrences(start, end):
+            if after and (s, event.id) <= after:
+                continue
+            occurrences.append(_occurrence(event, original, s, e, title))
+    return occurrences
+
+
+def _occurrence(
+    event: models.Event,
+    original: datetime,
+    start: datetime,
+    end: datetime,
+    title: str = None,
+) -> recurrence.Occurrence:
+    return recurrence.Occurrence(
+        id=event.id,
+        title=title or event.title,
+        start_time=start,
+        end_time=end,
+        user_id=event.user_id,
+        status=event.status,
+        participants=event.participants,
+        recurrence=event.recurrence,
+        occurrence_start=original,
+    )
+
+
+def _change_cursor(db: Session) -> int:
+    """
+    xmin of the current snapshot: every transaction below it has committed
+    or aborted, so no change-log row with a smaller txid can appear later.
+    """
+    return db.execute(
+        text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+    ).scalar()
+
+
+def get_event_changes(
+    db: Session,
+    user_id: int,
+    since: int,
+    start: datetime = None,
+    end: datetime = None,
+):
+    """
+    Delta since a change-log cursor:
+    (cursor, changed event ids, changed events, removed ids).
+    Only each event's latest change for this user counts. With start/end,
+    a changed recurring event comes back as its occurrences in that window
+    (as in list_user_events), possibly none; its id is still listed.
+
+    The new cursor is taken BEFORE reading the log. Changes committed by
+    transactions at or above it may show up again in the next delta;
+    that is harmless (the latest state is resent), unlike a skipped one.
+    """
+    cursor = _change_cursor(db)
+    latest = (
+        db.query(
+            models.EventChange.event_id,
+            func.max(models.EventChange.id).label("last_id"),
+        )
+        .filter(
+            models.EventChange.user_id == user_id,
+            models.EventChange.txid >= since,
+        )
+        .group_by(models.EventChange.event_id)
+        .subquery()
+    )
+    rows = (
+        db.query(models.EventChange.event_id, models.EventChange.action)
+        .join(latest, models.EventChange.id == latest.c.last_id)
+        .all()
+    )
+    if not rows:
+        return cursor, [], [], []
+
+    removed = sorted(event_id for event_id, action in rows if action == "removed")
+    changed_ids = sorted(event_id for event_id, action in rows if action != "removed")
+
+    events = []
+    if changed_ids:
+        query = (
+            db.query(models.Event)
+            .options(selectinload(models.Event.participants))
+            .filter(models.Event.id.in_(changed_ids))
+            .order_by(models.Event.start_time, models.Event.id)
+        )
+        if start and end:
+            query = query.options(selectinload(models.Event.exceptions))
+        events = query.all()
+
+    if start and end:
+        expanded = []
+        for event in events:
+            if not event.recurrence:
+                expanded.append(event)
+                continue
+            for original, s, e, title in _series(event).occurrences(start, end):
+                expanded.append(_occurrence(event, original, s, e, title))
+        events = sorted(expanded, key=lambda e: (e.start_time, e.id))
+    return cursor, changed_ids, events, removed
+
+
+def get_change_cursor(db: Session) -> int:
+    """
+    Where a new client starts syncing (take it before loading the calendar).
+    """
+    return _change_cursor(db)
+
+
+def _merge_intervals(intervals) -> list:
+    """
+    Sorted (start, end) pairs -> disjoint busy blocks, in one pass.
+    Touching intervals ([9, 10) and [10, 11)) are joined.
+    """
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def get_free_busy(db: Session, user_ids: list, start: datetime, end: datetime) -> dict:
+    """
+    Merged busy blocks per user inside [start, end), clipped to it, from
+    owned and joined active events (any role). No titles or ids leave here.
+
+    Single events come from ONE union query sorted by (user, start), so
+    each user's list is merged linearly; recurring events add their
+    occurrences in the window (one more query when there are none).
+    Returns {user_id: [(start, end), ...]} for every requested id.
+    """
+    window = _utc_range(start, end)
+    owned = select(
+        models.Event.user_id.label("uid"),
+        models.Event.start_time,
+        models.Event.end_time,
+    ).where(
+        models.Event.user_id.in_(user_ids),
+        models.active_single_event,
+        models.Event.during.overlaps(window),
+    )
+    joined = (
+        select(
+            models.event_participants.c.user_id.label("uid"),
+            models.Event.start_time,
+            models.Event.end_time,
+        )
+        .join(models.Event, models.Event.id == models.event_participants.c.event_id)
+        .where(
+            models.event_participants.c.user_id.in_(user_ids),
+            models.active_single_event,
+            models.Event.during.overlaps(window),
+        )
+    )
+    rows = union_all(owned, joined).subquery()
+    busy = {user_id: [] for user_id in user_ids}
+    for user_id, s, e in db.execute(select(rows).order_by(rows.c.uid, rows.c.start_time)):
+        busy[user_id].append((max(s, start), min(e, end)))
+
+    for user_id, intervals in _series_busy(db, user_ids, start, end).items():
+        clipped = sorted((max(s, start), min(e, end)) for s, e, _ in intervals)
+        busy[user_id] = list(heapq.merge(busy[user_id], clipped))
+
+    return {user_id: _merge_intervals(intervals) for user_id, intervals in busy.items()}
+
+
+def find_free_slots(
+    db: Session,
+    participant_ids: list,
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+    k: int,
+    step: timedelta,
+    hours: slots.WorkingHours = None,
+) -> list:
+    """
+    The k earliest slots in [start, end) where every regular-role
+    participant is free (admins never block, as in find_conflicts).
+    """
+    users = _load_users(db, participant_ids)
+    unknown = set(participant_ids) - users.keys()
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown participants: {sorted(unknown)}")
+
+    regular = [u.id for u in users.values() if _is_regular_user(u)]
+    busy = get_free_busy(db, regular, start, end) if regular else {}
+    return slots.find_slots(busy.values(), start, end, duration, k, step, hours)
+
+
 def get_user_events(db: Session, user_id: int):
     return db.query(models.Event).filter(models.Event.user_id == user_id).all()
 
@@ -260,8 +1212,117 @@ def cancel_event(db, event_id: int, current_user):
     event.status = "cancelled"
     event.cancelled_at = datetime.utcnow()
     event.cancelled_by = current_user.id
+    user_ids = _event_user_ids(event)
+    _delete_busy_rows(db, event.id)
+    _log_changes(db, event.id, "cancelled", user_ids)
+    outbox.enqueue_event_notifications(db, event, "cancelled", user_ids, current_user)
 
     db.commit()
     db.refresh(event)
 
+    busy_index.remove_event(event.id, user_ids)
+    cache.invalidate_calendars(user_ids)
+    publish_event_change(user_ids, event.id, "cancelled")
     return event
+
+
+# =====================================================
+# RECURRING EVENT OCCURRENCES
+# =====================================================
+
+def _load_occurrence(db: Session, event_id: int, occurrence_start: datetime, current_user):
+    """
+    The series, its rule and the exception row for one occurrence
+    (a new, unsaved one if the occurrence still follows the rule).
+    """
+    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    if event.status == "cancelled":
+        raise HTTPException(status_code=400, detail="Cannot edit a cancelled event")
+
+    if not event.recurrence:
+        raise HTTPException(status_code=400, detail="Event is not recurring")
+
+    is_owner = event.user_id == current_user.id
+    is_admin = current_user.role.name in ["admin", "super_admin"]
+
+    if not (is_owner or is_admin):
+        raise HTTPException(status_code=403, detail="Not allowed to edit this event")
+
+    series = _series(event)
+    if not series.is_occurrence(occurrence_start):
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+
+    for exc in event.exceptions:
+        if exc.occurrence_start == occurrence_start:
+            if exc.cancelled:
+                raise HTTPException(status_code=400, detail="Occurrence already cancelled")
+            return event, series, exc
+    exc = models.EventException(occurrence_start=occurrence_start, cancelled=False)
+    event.exceptions.append(exc)
+    return event, series, exc
+
+
+def cancel_occurrence(db: Session, event_id: int, occurrence_start: datetime, current_user):
+    event, series, exc = _load_occurrence(db, event_id, occurrence_start, current_user)
+    start, end, title = series.moved.get(
+        occurrence_start, (occurrence_start, occurrence_start + series.duration, None)
+    )
+
+    exc.cancelled = True
+    exc.start_time = exc.end_time = exc.title = None
+    user_ids = _event_user_ids(event)
+    _log_changes(db, event.id, "updated", user_ids)
+    outbox.enqueue_event_notifications(
+        db, _occurrence(event, occurrence_start, start, end, title), "cancelled", user_ids, current_user
+    )
+    db.commit()
+
+    cache.invalidate_calendars(user_ids)
+    publish_event_change(user_ids, event.id, "updated")
+
+
+def update_occurrence(
+    db: Session,
+    event_id: int,
+    occurrence_start: datetime,
+    data: schemas.OccurrenceUpdate,
+    current_user,
+) -> recurrence.Occurrence:
+    """
+    Move and/or retitle one occurrence; the rest of the series is untouched.
+    """
+    event, series, exc = _load_occurrence(db, event_id, occurrence_start, current_user)
+    if data.start_time < event.start_time:
+        raise HTTPException(status_code=400, detail="An occurrence can't move before the series starts")
+
+    users = [event.owner, *event.participants]
+    _lock_users(db, users)
+    conflicts = find_conflicts(db, users, data.start_time, data.end_time, exclude_event_id=event.id)
+    if conflicts:
+        _raise_conflicts(conflicts, current_user.id, "another event at this time")
+    siblings = [
+        occ for occ in series.occurrences(data.start_time, data.end_time)
+        if occ[0] != occurrence_start
+    ]
+    if siblings:
+        raise HTTPException(status_code=400, detail="Overlaps another occurrence of this event")
+
+    exc.start_time = data.start_time
+    exc.end_time = data.end_time
+    exc.title = data.title
+    if event.series_end is not None and data.end_time > event.series_end:
+        event.series_end = data.end_time
+
+    user_ids = _event_user_ids(event)
+    occurrence = _occurrence(event, occurrence_start, data.start_time, data.end_time, data.title)
+    _log_changes(db, event.id, "updated", user_ids)
+    outbox.enqueue_event_notifications(db, occurrence, "updated", user_ids, current_user)
+    db.commit()
+
+    cache.invalidate_calendars(user_ids)
+    publish_event_change(user_ids, event.id, "updated")
+    return occurrence
@@ -1,8 +1,27 @@
+import itertools
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.dml import UpdateBase
 from urllib.parse import quote_plus  # For URL-encoding the password
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (
+    DB_ASYNC,
+    DB_REPLICA_URLS,
+    REPLICA_RETRY_SECONDS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+)
+from app.utils import cache
+from app.utils.db_metrics import InstrumentedAsyncPool, InstrumentedQueuePool, track_queries
 
 load_dotenv()
 
@@ -13,13 +32,190 @@ DB_NAME = os.getenv("DB_NAME")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+class ReplicaSet:
+    """
+    Read replicas, picked round-robin. A replica whose connection fails is
+    skipped for `retry_seconds`, then tried again.
+    """
+
+    def __init__(self, engines, retry_seconds: float):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._down_until = {}
+        self._next = itertools.count()
+
+    def mark_down(self, replica):
+        self._down_until[replica] = time.monotonic() + self.retry_seconds
+
+    def pick(self):
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            replica = self.engines[next(self._next) % len(self.engines)]
+            if self._down_until.get(replica, 0) <= now:
+                return replica
+        return None
+
+
+class RoutingSession(Session):
+    """
+    Statements go to the primary unless read_db() picked a replica for the
+    current block of read-only work. Flushes and INSERT/UPDATE/DELETE always
+    use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    # the rest of this session must read its own writes
+    session.info["wrote"] = True
+
+
+POOL_OPTIONS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+# replicas always pre-ping: that is how a dead one is noticed and skipped
+REPLICA_POOL_OPTIONS = {**POOL_OPTIONS, "pool_pre_ping": True}
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_logging_name="primary",
+    **POOL_OPTIONS,
+)
+SessionLocal = sessionmaker(bind=engine, class_=RoutingSession, autoflush=False, autocommit=False)
 Base = declarative_base()
 
-def get_db():
-    db: Session = SessionLocal()
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=InstrumentedAsyncPool,
+        pool_logging_name="primary",
+        **POOL_OPTIONS,
+    )
+    request_engine = async_engine.sync_engine
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, sync_session_class=RoutingSession, autoflush=False
+    )
+    replicas = ReplicaSet(
+        [
+            create_async_engine(
+                make_url(url).set(drivername="postgresql+asyncpg"),
+                poolclass=InstrumentedAsyncPool,
+                pool_logging_name=f"replica{i}",
+                **REPLICA_POOL_OPTIONS,
+            ).sync_engine
+            for i, url in enumerate(DB_REPLICA_URLS)
+        ],
+        REPLICA_RETRY_SECONDS,
+    )
+
+    async def get_db():
+        """
+        The ONE (async) session of a request, shared by auth, authz and
+        the route. It connects on its first query only.
+        """
+        async with AsyncSessionLocal() as db:
+            yield db
+
+else:
+    request_engine = engine
+    replicas = ReplicaSet(
+        [
+            create_engine(
+                url,
+                poolclass=InstrumentedQueuePool,
+                pool_logging_name=f"replica{i}",
+                **REPLICA_POOL_OPTIONS,
+            )
+            for i, url in enumerate(DB_REPLICA_URLS)
+        ],
+        REPLICA_RETRY_SECONDS,
+    )
+
+    def get_db():
+        """
+        The ONE session of a request. FastAPI caches dependencies per request,
+        so auth, authz and the route all receive this same session (and share
+        its identity map). A Session only checks out a pooled connection on
+        its first query, so requests answered from caches never touch the pool.
+        """
+        db: Session = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+for _engine in {engine, request_engine, *replicas.engines}:
+    track_queries(_engine)
+
+
+def pool_engines():
+    """
+    The engines serving requests, by pool name (for /metrics/pool).
+    """
+    engines = {"primary": request_engine}
+    for replica in replicas.engines:
+        engines[replica.pool._orig_logging_name] = replica
+    return engines
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run synchronous ORM code `fn(session, *args)` from an async route.
+    - DB_ASYNC: on the AsyncSession's greenlet bridge; I/O waits on asyncpg
+      without blocking the event loop or occupying a thread
+    - otherwise: in the threadpool, exactly like a sync route
+    crud therefore has one implementation for both modes.
+    """
+    if DB_ASYNC:
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def read_db(db, fn, *args, **kwargs):
+    """
+    run_db() for read-only work, which may be served by a replica.
+    """
+    return await run_db(db, _read_on_replica, fn, *args, **kwargs)
+
+
+def _read_on_replica(db: Session, fn, *args, **kwargs):
+    if (
+        not replicas.engines
+        or db.info.get("wrote")
+        or cache.is_pinned(db.info.get("user_id"))
+    ):
+        return fn(db, *args, **kwargs)
+
+    replica = replicas.pick()
+    if replica is None:
+        # every replica is down
+        return fn(db, *args, **kwargs)
+
+    db.info["replica"] = replica
     try:
-        yield db
+        return fn(db, *args, **kwargs)
+    except (OperationalError, OSError):
+        # the replica is unreachable or went away mid-request (asyncpg
+        # surfaces refused connects as plain OSError): answer from the primary
+        replicas.mark_down(replica)
+        db.rollback()
+        db.info.pop("replica", None)
+        return fn(db, *args, **kwargs)
     finally:
-        db.close()
\ No newline at end of file
+        db.info.pop("replica", None)
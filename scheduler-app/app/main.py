@@ -1,8 +1,71 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.requests import HTTPConnection
 from app.routers import users, events
+from app import auth, database
+from app.utils.realtime import broker
+from app.utils import cache, email, outbox
+from app.config import EMAIL_OUTBOX_WORKER
+from app.utils.db_metrics import QueryStats, current_queries, pool_stats
+from app.utils.metrics import Timings, collect, current_route, current_timings, render_prometheus, timed
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+
+
+def route_template(scope) -> str:
+    """
+    "GET /events/{event_id}" for the matched route (low-cardinality label).
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+
+    # route.path may or may not carry the include_router prefix (depends on
+    # the FastAPI version); recover it from the concrete request path
+    template = getattr(route, "path_format", route.path)
+    concrete = template.format(**scope.get("path_params", {}))
+    path = scope["path"]
+    prefix = path[: len(path) - len(concrete)] if path.endswith(concrete) else ""
+    return f"{scope.get('method', 'WS')} {prefix}{template}"
+
+
+async def label_route(connection: HTTPConnection):
+    """
+    Tag the request with its route template for per-route metrics. Runs
+    first among the dependencies, on the request's own task, so everything
+    after it (db work included) sees the label.
+    """
+    current_route.set(route_template(connection.scope))
+
+
+class TimedJSONResponse(JSONResponse):
+    """
+    JSON rendering counts towards the request's "serialize" phase.
+    """
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EMAIL_OUTBOX_WORKER:
+        outbox.worker.start()
+    yield
+    outbox.worker.stop()
+    if isinstance(email.backend, email.SMTPBackend):
+        email.backend.pool.close_all()
+
+
+app = FastAPI(
+    dependencies=[Depends(label_route)],
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan,
+)
 
 # Add CORS middleware BEFORE including routers
 app.add_middleware(
@@ -11,8 +74,109 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "X-DB-Queries", "X-DB-Time-Ms", "X-DB-Repeated", "Server-Timing",
+    ],
 )
 
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """
+    Per-request accounting:
+    - SQL: X-DB-Queries / X-DB-Time-Ms / X-DB-Repeated, a log line and the
+      route's query budget
+    - latency: Server-Timing (auth, db, serialize, total) and the
+      http_request_duration_seconds histograms behind /metrics
+    """
+    started = time.perf_counter()
+    stats = QueryStats()
+    current_queries.set(stats)
+    timings = Timings()
+    current_timings.set(timings)
+
+    response = await call_next(request)
+
+    route = route_template(request.scope)
+    timings.add("db", stats.seconds)
+    timings.add("total", time.perf_counter() - started)
+    timings.observe(route)
+    response.headers.update(stats.headers())
+    response.headers["Server-Timing"] = timings.header()
+    stats.check(route)
+    return response
+
 # Now include your routers
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(events.router, prefix="/events", tags=["Events"])
+
+
+# Operational metrics expose pool sizes, cache ratios, the outbox backlog and
+# per-route latency: admins only (scrapers send an admin's bearer token)
+@app.get("/metrics/cache", tags=["Metrics"], dependencies=[Depends(auth.get_current_admin)])
+def cache_metrics():
+    return cache.stats()
+
+
+@app.get("/metrics/pool", tags=["Metrics"], dependencies=[Depends(auth.get_current_admin)])
+def pool_metrics():
+    return pool_stats(database.pool_engines())
+
+
+@app.get("/metrics/email", tags=["Metrics"], dependencies=[Depends(auth.get_current_admin)])
+def email_metrics():
+    return email.stats()
+
+
+@app.get(
+    "/metrics",
+    tags=["Metrics"],
+    response_class=PlainTextResponse,
+    dependencies=[Depends(auth.get_current_admin)],
+)
+def prometheus_metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/latency", tags=["Metrics"], dependencies=[Depends(auth.get_current_admin)])
+def latency_metrics():
+    """
+    p50/p99 total latency per route, estimated from the histograms.
+    """
+    return {
+        metric.labels["route"]: {
+            "count": metric.snapshot()["count"],
+            "p50_ms": round(metric.quantile(0.5) * 1000, 1),
+            "p99_ms": round(metric.quantile(0.99) * 1000, 1),
+        }
+        for metric in collect("http_request_duration_seconds")
+        if metric.labels["phase"] == "total" and metric.quantile(0.5) is not None
+    }
+
+
+# Real-time calendar push: clients get {"event_id", "action"} whenever an
+# event they own or join changes, then pull it via GET /events/changes.
+@app.websocket("/ws/events")
+async def events_socket(websocket: WebSocket, token: str = Query(...)):
+    try:
+        user_id = int(auth.decode_access_token(token).get("sub"))
+    except (HTTPException, TypeError, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = broker.subscribe(user_id)
+
+    async def forward():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            # client messages are only keep-alives; this also spots disconnects
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        broker.unsubscribe(user_id, queue)
@@ -1,5 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Table, Boolean,
+    Computed, Index, DDL, and_, event, literal_column, text,
+)
+from sqlalchemy.dialects.postgresql import TSTZRANGE, ExcludeConstraint
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from .database import Base
 from app import utils
 
@@ -7,8 +12,18 @@ from app import utils
 event_participants = Table(
     "event_participants",
     Base.metadata,
-    Column("user_id", Integer, ForeignKey("users.id")),
-    Column("event_id", Integer, ForeignKey("events.id"))
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("event_id", Integer, ForeignKey("events.id"), primary_key=True),
+    # the primary key (user_id, event_id) serves "events of these users";
+    # this one loads an event's participants
+    Index("ix_event_participants_event_id", "event_id"),
+)
+
+# btree_gist lets the busy table's exclusion constraint compare user_id with "="
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"),
 )
 
 # Association table between roles and permissions
@@ -93,6 +108,50 @@ class Event(Base):
     cancelled_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     cancellation_reason = Column(String, nullable=True)
 
+    # RRULE subset (app.utils.recurrence); start/end are the first occurrence.
+    # series_end is the last occurrence's end, NULL while unbounded.
+    # Series have no event_busy rows: their conflicts are computed per rule.
+    recurrence = Column(String, nullable=True)
+    series_end = Column(DateTime, nullable=True)
+
+    # [start, end) as a range, maintained by PostgreSQL (GiST indexed)
+    during = Column(
+        TSTZRANGE,
+        Computed(
+            "tstzrange(start_time AT TIME ZONE 'UTC', end_time AT TIME ZONE 'UTC', '[)')",
+            persisted=True,
+        ),
+    )
+
+    __table_args__ = (
+        Index("ix_events_during", "during", postgresql_using="gist"),
+        Index("ix_events_user_id_start_time_id", "user_id", "start_time", "id"),
+        # Conflict / busy lookups only ever want active events, so these
+        # indexes skip cancelled history. Queries must repeat the predicate
+        # (see active_single_event / active_series below).
+        Index(
+            "ix_events_active_user_id_start_time",
+            "user_id",
+            "start_time",
+            "end_time",
+            postgresql_include=["id"],
+            postgresql_where=text("status = 'active' AND recurrence IS NULL"),
+        ),
+        Index(
+            "ix_events_active_user_id_during",
+            "user_id",
+            "during",
+            postgresql_using="gist",
+            postgresql_where=text("status = 'active' AND recurrence IS NULL"),
+        ),
+        Index(
+            "ix_events_series",
+            "user_id",
+            "start_time",
+            postgresql_where=text("status = 'active' AND recurrence IS NOT NULL"),
+        ),
+    )
+
     owner = relationship(
         "User",
         back_populates="events",
@@ -104,3 +163,143 @@ class Event(Base):
         secondary="event_participants",
         back_populates="participating_events"
     )
+
+    exceptions = relationship(
+        "EventException",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+# WHERE clauses matching the partial indexes above. 'active' is a literal,
+# not a bound parameter: the planner can only prove a partial index applies
+# from constants it sees, and a prepared statement's generic plan hides them.
+active_single_event = and_(
+    Event.status == literal_column("'active'"),
+    Event.recurrence.is_(None),
+)
+active_series = and_(
+    Event.status == literal_column("'active'"),
+    Event.recurrence.isnot(None),
+)
+
+
+class EventBusy(Base):
+    """
+    One row per (active event, regular-role user) pair.
+    The exclusion constraint makes double-booking a regular user impossible,
+    even for concurrent writers.
+    """
+    __tablename__ = "event_busy"
+
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    during = Column(TSTZRANGE, nullable=False)
+
+    __table_args__ = (
+        ExcludeConstraint(
+            ("user_id", "="),
+            ("during", "&&"),
+            name="event_busy_no_overlap",
+            using="gist",
+        ),
+    )
+
+
+class EventException(Base):
+    """
+    A single occurrence of a recurring event that differs from its rule:
+    cancelled, or moved / retitled (start_time, end_time, title).
+    Keyed by the occurrence's original start, so only exceptions are stored.
+    """
+    __tablename__ = "event_exceptions"
+
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    occurrence_start = Column(DateTime, primary_key=True)
+    cancelled = Column(Boolean, default=False, nullable=False)
+    start_time = Column(DateTime, nullable=True)
+    end_time = Column(DateTime, nullable=True)
+    title = Column(String, nullable=True)
+
+
+class EventChange(Base):
+    """
+    Append-only log: one row per (event change, affected user).
+    action: created | updated | cancelled | removed (user left the event)
+
+    txid (the writing transaction's id) is the delta-sync cursor for
+    GET /events/changes. Ids come from a sequence before commit, so a
+    reader can see id 101 while id 100 is still uncommitted; a snapshot's
+    xmin instead guarantees every transaction below it has finished.
+    """
+    __tablename__ = "event_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    action = Column(String, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    txid = Column(
+        BigInteger,
+        server_default=text("(pg_current_xact_id()::text::bigint)"),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        Index("ix_event_changes_user_id_txid", "user_id", "txid"),
+    )
+
+
+class EmailOutbox(Base):
+    """
+    Transactional outbox: mail is inserted in the same transaction as the
+    change that triggers it and delivered later by app.utils.outbox.
+    status: pending | sent | dead (gave up after EMAIL_MAX_ATTEMPTS)
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body_text = Column(Text, nullable=False)
+    body_html = Column(Text, nullable=True)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # the worker's poll: due pending rows only
+        Index(
+            "ix_email_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+
+class EventNotification(Base):
+    """
+    A pending "your event changed" notice for one recipient. The outbox
+    worker folds each recipient's notices into one email once the oldest
+    is NOTIFY_DIGEST_WINDOW_SECONDS old, then deletes them.
+    Title/times are snapshotted at change time.
+    action: updated | cancelled | removed (recipient taken off the event)
+    """
+    __tablename__ = "event_notifications"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    action = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    changed_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_event_notifications_user_id_created_at", "user_id", "created_at"),
+    )
@@ -1,24 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session, joinedload
 from .. import schemas, crud, auth, models
-from ..database import SessionLocal
+from ..database import get_db, read_db, run_db
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from app.utils.permissions import has_permission
-from typing import List, Dict, Any
+from app.utils import cache
+from app.utils.db_metrics import current_queries, query_budget
+from app.utils.metrics import timed
+from app.utils.slots import WorkingHours
+from app.config import BULK_EVENTS_MAX, FREEBUSY_MAX_USERS, FREEBUSY_MAX_DAYS, AUTO_SCHEDULE_MAX_MEETINGS
+from fastapi.encoders import jsonable_encoder
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from jose import jwt
+import base64
+import math
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def _serialize_user(user: models.User) -> Dict[str, Any]:
     """Return simple dict for User matching UserOut: role as string and permissions dict."""
     role_name = user.role.name if user.role else None
@@ -42,10 +43,40 @@ def _serialize_event(e: models.Event) -> Dict[str, Any]:
         "user_id": e.user_id,
         "status": e.status,  # ✅ ADD THIS
         "participants": participants,
+        "recurrence": e.recurrence,
+        # only set on occurrences expanded from a recurring event
+        "occurrence_start": getattr(e, "occurrence_start", None),
     }
 
+def _encode_cursor(key) -> str:
+    start_time, event_id = key
+    raw = f"{start_time.isoformat()}|{event_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start_time, event_id = raw.split("|")
+        return datetime.fromisoformat(start_time), int(event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _load_event(db: Session, event_id: int) -> Dict[str, Any]:
+    """
+    Re-query an event with participants -> role -> permissions and serialize
+    it while still inside the session (no lazy loads afterwards).
+    """
+    db_event = (
+        db.query(models.Event)
+        .options(joinedload(models.Event.participants).joinedload(models.User.role).joinedload(models.Role.permissions))
+        .filter(models.Event.id == event_id)
+        .first()
+    )
+    with timed("serialize"):
+        return _serialize_event(db_event)
+
 @router.post("/", response_model=schemas.EventOut)
-def create_event(
+async def create_event(
     event: schemas.EventCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
@@ -54,71 +85,343 @@ def create_event(
     if not has_permission(current_user, "can_create_events"):
         raise HTTPException(status_code=403, detail="Not authorized to create events")
 
+    return await run_db(db, _create_event, event, current_user)
+
+def _create_event(db: Session, event: schemas.EventCreate, current_user: models.User):
     # Use your crud function (it returns an ORM Event)
-    db_event = crud.create_event(db, event, owner_id=current_user.id)
+    db_event = crud.create_event(db, event, owner=current_user)
 
     # eager-load role permissions for participants might not be loaded here;
     # refresh via query to be safe (load participants -> role -> permissions)
-    db_event = (
-        db.query(models.Event)
-        .options(joinedload(models.Event.participants).joinedload(models.User.role).joinedload(models.Role.permissions))
-        .filter(models.Event.id == db_event.id)
-        .first()
-    )
-
-    serialized = _serialize_event(db_event)
+    serialized = _load_event(db, db_event.id)
     # EventOut expects datetime objects — returning ISO strings is acceptable if client expects them;
     # if you require actual datetimes, change serialization above to pass datetimes (we used isoformat to be safe).
     return serialized
 
-@router.get("/", response_model=List[schemas.EventOut])
-def list_events(
+def _set_bulk_budget(events, extra: int = 0):
+    """
+    principal + participants + roles + lock + busy intervals (single
+    events, series + their participants + exceptions), then the four
+    inserts, each sent in pages of up to 1000 rows.
+    """
+    links = sum(len(e.participants or []) + 1 for e in events)
+    stats = current_queries.get()
+    if stats is not None:
+        stats.budget = 8 + extra + math.ceil(len(events) / 1000) + 3 * math.ceil(links / 1000)
+
+@router.post("/bulk", response_model=schemas.EventBulkResponse)
+async def create_events_bulk(
+    events: List[schemas.EventBulkItem],
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    # Load events where user is owner or participant; eager load role & permissions for participants
-    events = (
-        db.query(models.Event)
-        .options(joinedload(models.Event.participants).joinedload(models.User.role).joinedload(models.Role.permissions))
-        .filter(
-            (models.Event.user_id == current_user.id)
-            | (models.Event.participants.any(models.User.id == current_user.id))
+    """
+    Create many events at once (e.g. a semester import). Each item is
+    checked against existing events and earlier items of the batch;
+    conflicting or invalid items are reported and the rest are created.
+    """
+    if not has_permission(current_user, "can_create_events"):
+        raise HTTPException(status_code=403, detail="Not authorized to create events")
+    if len(events) > BULK_EVENTS_MAX:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BULK_EVENTS_MAX} events per request"
         )
-        .all()
+
+    _set_bulk_budget(events)
+
+    results = await run_db(db, crud.create_events_bulk, events, current_user)
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"created": created, "rejected": len(results) - created, "results": results}
+
+# principal + busy union + recurring events, their participants and exceptions
+@router.post(
+    "/freebusy",
+    response_model=schemas.FreeBusyResponse,
+    dependencies=[Depends(query_budget(5))],
+)
+async def free_busy(
+    request: schemas.FreeBusyRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Merged busy blocks of each user in [start, end) — times only, no titles —
+    so pickers can show who is free before saving.
+    """
+    user_ids = list(dict.fromkeys(request.user_ids))
+    if len(user_ids) > FREEBUSY_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {FREEBUSY_MAX_USERS} users per request")
+    if request.end - request.start > timedelta(days=FREEBUSY_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"The window can span at most {FREEBUSY_MAX_DAYS} days")
+
+    busy = await read_db(db, crud.get_free_busy, user_ids, request.start, request.end)
+    return {
+        "start": request.start,
+        "end": request.end,
+        "users": [
+            {"user_id": user_id, "busy": [{"start": s, "end": e} for s, e in busy[user_id]]}
+            for user_id in user_ids
+        ],
+    }
+
+# principal + participants + roles, then the free/busy queries
+@router.post(
+    "/find-slot",
+    response_model=schemas.FindSlotResponse,
+    dependencies=[Depends(query_budget(7))],
+)
+async def find_slot(
+    request: schemas.FindSlotRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    The k earliest times in [start, end) when every participant is free,
+    optionally limited to working hours. Only role 'user' can block a slot.
+    """
+    participants = list(dict.fromkeys(request.participants))
+    if len(participants) > FREEBUSY_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {FREEBUSY_MAX_USERS} participants per request")
+    if request.end - request.start > timedelta(days=FREEBUSY_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"The window can span at most {FREEBUSY_MAX_DAYS} days")
+
+    hours = None
+    if request.working_hours:
+        hours = WorkingHours(**request.working_hours.model_dump())
+    found = await read_db(
+        db,
+        crud.find_free_slots,
+        participants,
+        request.start,
+        request.end,
+        timedelta(minutes=request.duration_minutes),
+        request.k,
+        timedelta(minutes=request.step_minutes),
+        hours,
     )
+    return {
+        "duration_minutes": request.duration_minutes,
+        "slots": [{"start": s, "end": e} for s, e in found],
+    }
 
-    result = [_serialize_event(e) for e in events]
-    return result
+@router.post("/auto-schedule", response_model=schemas.AutoScheduleResponse)
+async def auto_schedule(
+    request: schemas.AutoScheduleRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Place many meetings at once without conflicts (priority first, then
+    the most constrained). You attend every meeting. Meetings that can't
+    fit are reported; with commit=true the rest are created atomically.
+    """
+    meetings = request.meetings
+    if not meetings:
+        raise HTTPException(status_code=400, detail="No meetings to schedule")
+    if len(meetings) > AUTO_SCHEDULE_MAX_MEETINGS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {AUTO_SCHEDULE_MAX_MEETINGS} meetings per request"
+        )
+    span = max(m.end for m in meetings) - min(m.start for m in meetings)
+    if span > timedelta(days=FREEBUSY_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Meetings can span at most {FREEBUSY_MAX_DAYS} days")
+    if request.commit and not has_permission(current_user, "can_create_events"):
+        raise HTTPException(status_code=403, detail="Not authorized to create events")
+
+    hours = None
+    if request.working_hours:
+        hours = WorkingHours(**request.working_hours.model_dump())
+    step = timedelta(minutes=request.step_minutes)
+    if request.commit:
+        # planning reads (users, roles, lock, busy) come before the bulk insert
+        _set_bulk_budget(meetings, extra=7)
+        results = await run_db(db, crud.auto_schedule, meetings, current_user, step, hours, True)
+    else:
+        results = await read_db(db, crud.auto_schedule, meetings, current_user, step, hours)
+
+    placed = sum(1 for r in results if r["status"] == "placed")
+    return {
+        "placed": placed,
+        "unplaced": len(results) - placed,
+        "committed": request.commit and placed > 0,
+        "results": results,
+    }
+
+# budgets: principal (cache miss) + events + participants (selectin)
+# + recurring events, their participants and exceptions (selectin)
+@router.get(
+    "/",
+    response_model=List[schemas.EventOut],
+    dependencies=[Depends(query_budget(6))],
+)
+async def list_events(
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = Query(None, pattern="^(active|cancelled)$"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Events the user owns or joined.
+    - start/end: FullCalendar's visible range (events overlapping it);
+      recurring events are expanded into their occurrences in it
+    - status: active | cancelled
+    - cursor/limit: keyset pages on (start_time, id); the next page's
+      cursor comes back in the X-Next-Cursor header
+    """
+    filters = dict(
+        start=schemas.to_naive_utc(start),
+        end=schemas.to_naive_utc(end),
+        status=status,
+        after=_decode_cursor(cursor) if cursor else None,
+        limit=limit,
+    )
+    page = cache_key = None
+    # The calendar version changes on every write touching this user and the
+    # directory version on any profile/role change (participants are embedded).
+    # Only trusted when every worker shares them (else another worker's write
+    # would never bump ours): then a stale page is never served
+    if cache.versions_shared:
+        key_parts = (
+            current_user.id,
+            *await cache.call(_versions, current_user.id),
+            start and start.isoformat(),
+            end and end.isoformat(),
+            status,
+            cursor,
+            limit,
+        )
+        etag = cache.make_etag("events", *key_parts)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if cache.etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+        cache_key = ":".join(str(part) for part in ("events", *key_parts))
+        page = await cache.call(cache.lookup, cache_key)
+
+    if page is None:
+        page = await read_db(db, _load_page, current_user.id, **filters)
+        if cache_key:
+            await cache.call(cache.store, cache_key, page)
+
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["events"]
+
+def _versions(user_id: int):
+    return cache.calendar_version(user_id), cache.directory_version()
+
+def _load_page(db: Session, user_id: int, **filters) -> Dict[str, Any]:
+    events, next_key = crud.list_user_events(db, user_id, **filters)
+    with timed("serialize"):
+        serialized = jsonable_encoder([_serialize_event(e) for e in events])
+    return {
+        "events": serialized,
+        "next_cursor": _encode_cursor(next_key) if next_key else None,
+    }
+
+# principal + snapshot + change log + events + participants (+ exceptions)
+@router.get(
+    "/changes",
+    response_model=schemas.EventChanges,
+    dependencies=[Depends(query_budget(6))],
+)
+async def list_event_changes(
+    since: Optional[int] = Query(None, ge=0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Incremental sync. Call without `since` to get the current cursor,
+    then pass it back to receive only events created/updated/cancelled
+    since, plus ids of events the user was removed from.
+    - start/end: the range the client shows; changed recurring events come
+      back as their occurrences in it; drop every shown entry whose id is
+      in `updated` before adding `events`
+    """
+    return await read_db(
+        db,
+        _load_changes,
+        current_user.id,
+        since,
+        schemas.to_naive_utc(start),
+        schemas.to_naive_utc(end),
+    )
+
+def _load_changes(db: Session, user_id: int, since: Optional[int], start=None, end=None):
+    if since is None:
+        return {"cursor": crud.get_change_cursor(db)}
+
+    cursor, updated, events, removed = crud.get_event_changes(db, user_id, since, start, end)
+    with timed("serialize"):
+        serialized = [_serialize_event(e) for e in events]
+    return {
+        "cursor": cursor,
+        "updated": updated,
+        "events": serialized,
+        "removed": removed,
+    }
 
 @router.delete("/{event_id}")
-def cancel_event_endpoint(
+async def cancel_event_endpoint(
     event_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    event = crud.cancel_event(db, event_id, current_user)
-    return {"message": "Event cancelled", "event_id": event.id}
+    await run_db(db, crud.cancel_event, event_id, current_user)
+    return {"message": "Event cancelled", "event_id": event_id}
 
 @router.put("/{event_id}", response_model=schemas.EventOut)
-def update_event_endpoint(
+async def update_event_endpoint(
     event_id: int,
     event: schemas.EventCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    updated_event = crud.update_event(db, event_id, event, current_user)
+    return await run_db(db, _update_event, event_id, event, current_user)
 
-    updated_event = (
-        db.query(models.Event)
-        .options(
-            joinedload(models.Event.participants)
-            .joinedload(models.User.role)
-            .joinedload(models.Role.permissions)
-        )
-        .filter(models.Event.id == updated_event.id)
-        .first()
-    )
+def _update_event(db: Session, event_id: int, event: schemas.EventCreate, current_user: models.User):
+    updated_event = crud.update_event(db, event_id, event, current_user)
+    return _load_event(db, updated_event.id)
 
-    return _serialize_event(updated_event)
+@router.delete("/{event_id}/occurrences/{occurrence_start}")
+async def cancel_occurrence_endpoint(
+    event_id: int,
+    occurrence_start: datetime,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Cancel one occurrence of a recurring event (`occurrence_start` is the
+    occurrence_start listed for it).
+    """
+    occurrence_start = schemas.to_naive_utc(occurrence_start)
+    await run_db(db, crud.cancel_occurrence, event_id, occurrence_start, current_user)
+    return {"message": "Occurrence cancelled", "event_id": event_id, "occurrence_start": occurrence_start}
 
+@router.put("/{event_id}/occurrences/{occurrence_start}", response_model=schemas.EventOut)
+async def update_occurrence_endpoint(
+    event_id: int,
+    occurrence_start: datetime,
+    occurrence: schemas.OccurrenceUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Move or retitle one occurrence of a recurring event.
+    """
+    return await run_db(
+        db, _update_occurrence, event_id, schemas.to_naive_utc(occurrence_start), occurrence, current_user
+    )
 
+def _update_occurrence(db: Session, event_id: int, occurrence_start: datetime, occurrence, current_user):
+    updated = crud.update_occurrence(db, event_id, occurrence_start, occurrence, current_user)
+    with timed("serialize"):
+        return _serialize_event(updated)
@@ -1,13 +1,13 @@
 from sqlalchemy.orm import Session, joinedload
 from fastapi.security import OAuth2PasswordRequestForm
-from typing import List
+from typing import List, Optional
 from app import crud, schemas, models, auth
-from app.database import SessionLocal
+from app.database import get_db, read_db, run_db
 from app.auth import create_access_token
 from app.crud import generate_invite_token
-from app.utils.email import send_invite_email
+from app.utils import outbox
 from app.config import SECRET_KEY, ALGORITHM
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from app import models, schemas, utils, database, auth
@@ -15,6 +15,9 @@ from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.utils.permissions import has_permission
 import secrets
 from app.authz import require_action
+from app.utils import cache
+from app.utils.db_metrics import query_budget
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(tags=["Users"])
 
@@ -41,25 +44,19 @@ def format_user_response(user: models.User):
     }
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/register")
-def register_user(
+async def register_user(
     data: schemas.UserRegister,
     db: Session = Depends(get_db)
 ):
-    name = data.name
-    email = data.email
-    mobile = data.mobile
-    password = data.password
-    token = data.token
-    
+    # Unauthenticated endpoint: reject taken emails/mobiles before the
+    # bcrypt hash (CPU-bound: hashed in the threadpool, never on the loop)
+    await run_db(db, _check_unregistered, data.email, data.mobile)
+    hashed_pw = await run_in_threadpool(auth.get_password_hash, data.password)
+    return await run_db(db, _register_user, data, hashed_pw)
+
+
+def _check_unregistered(db: Session, email: Optional[str], mobile: Optional[str]):
     if email:
         if db.query(models.User).filter(models.User.email == email).first():
             raise HTTPException(status_code=400, detail="Email already registered")
@@ -69,6 +66,15 @@ def register_user(
             raise HTTPException(status_code=400, detail="Mobile already registered")
 
 
+def _register_user(db: Session, data: schemas.UserRegister, hashed_pw: str):
+    name = data.name
+    email = data.email
+    mobile = data.mobile
+    token = data.token
+
+    # again: another request may have registered them during the hash
+    _check_unregistered(db, email, mobile)
+
     # --- If registering through invite link ---
     if token:
         try:
@@ -85,11 +91,13 @@ def register_user(
         if existing:
             # Activate the invited user by setting their name and new password
             existing.name = name
-            existing.hashed_password = auth.get_password_hash(password)
+            existing.hashed_password = hashed_pw
             role_obj = db.query(models.Role).filter(models.Role.name == role_name).first()
             if role_obj:
                 existing.role = role_obj
+                crud.sync_user_busy_rows(db, existing)
             db.commit()
+            cache.invalidate_user(existing.id)
             db.refresh(existing)
             return format_user_response(existing)
         else:
@@ -100,8 +108,6 @@ def register_user(
         role_name = "user"
 
     # --- If not existing (normal registration) ---
-    hashed_pw = auth.get_password_hash(password)
-
     # Find role object (important: assign relationship, not string)
     role_obj = db.query(models.Role).filter(models.Role.name == role_name).first()
     if not role_obj:
@@ -117,15 +123,18 @@ def register_user(
     )
     db.add(new_user)
     db.commit()
+    cache.invalidate_directory()
     db.refresh(new_user)
 
     return {"message": "Registration successful"}
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_db(db, crud.get_user_by_identifier, form_data.username)
+    if not user or not await run_in_threadpool(
+        auth.verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     access_token = create_access_token(
         data={"sub": str(user.id)}
@@ -137,15 +146,19 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     response_model=schemas.UserOut,
     dependencies=[Depends(require_action("update_permissions"))],
 )
-def update_permissions(
+async def update_permissions(
     user_id: int,
     perm_update: schemas.UserPermissionUpdate,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(get_db),
 ):
     """
     Only SUPER ADMIN can update user roles.
     Admin is explicitly blocked by authz.
     """
+    return await run_db(db, _update_permissions, user_id, perm_update)
+
+
+def _update_permissions(db: Session, user_id: int, perm_update: schemas.UserPermissionUpdate):
 
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
@@ -162,14 +175,37 @@ def update_permissions(
         )
 
     user.role = role_obj
+    crud.sync_user_busy_rows(db, user)
     db.commit()
+    cache.invalidate_user(user.id)
     db.refresh(user)
 
     return format_user_response(user)
 
 
-@router.get("/", response_model=List[schemas.UserOut])
-def get_other_users(db: Session = Depends(database.get_db)):
+@router.get(
+    "/",
+    response_model=List[schemas.UserOut],
+    dependencies=[Depends(query_budget(1))],
+)
+async def get_other_users(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    if not cache.versions_shared:
+        return await read_db(db, _list_users)
+
+    # Any user write bumps the directory version: unchanged polls stop here
+    etag = cache.make_etag("users", await cache.call(cache.directory_version))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return await read_db(db, _list_users)
+
+
+def _list_users(db: Session):
     # Eager load role -> permissions to avoid lazy-loading surprises
     users = db.query(models.User).options(
         joinedload(models.User.role).joinedload(models.Role.permissions)
@@ -193,9 +229,9 @@ def get_other_users(db: Session = Depends(database.get_db)):
     response_model=schemas.UserOut,
     dependencies=[Depends(require_action("invite_user"))],
 )
-def invite_user(
+async def invite_user(
     user_invite: schemas.UserInvite,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
     """
@@ -207,6 +243,34 @@ def invite_user(
     if current_user.role.name == "admin" and user_invite.role != "user":
         raise HTTPException(status_code=403, detail="Admins can only invite normal users")
 
+    # Temporary password for a new invitee (hashed off the event loop)
+    temp_password = secrets.token_urlsafe(16)
+    hashed_temp = await run_in_threadpool(auth.get_password_hash, temp_password)
+
+    user_out, token = await run_db(db, _invite_user, user_invite, hashed_temp)
+
+    # ✅ The invite email was queued with the user row; deliver it now
+    outbox.worker.wake()
+
+    # Debugging prints (optional)
+    print(f"✅ Invite queued for: {user_out['email']}")
+    print(f"🔗 Invite link: http://localhost:3000/register?token={token}")
+
+    return user_out
+
+
+def _invite_token(user: models.User) -> str:
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    token_data = {"sub": user.email, "role": user.role.name, "exp": expire}
+    return jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def _invite_user(db: Session, user_invite: schemas.UserInvite, hashed_temp: str):
+    """
+    Create or re-role the invitee and queue the invite email in the same
+    transaction; returns (UserOut dict, invite token).
+    """
+
     # ✅ Validate role
     role_obj = db.query(models.Role).filter(models.Role.name == user_invite.role).first()
     if not role_obj:
@@ -217,23 +281,17 @@ def invite_user(
     # ✅ If user already exists, just update role
     if existing_user:
         existing_user.role = role_obj
-        db.commit()
-        db.refresh(existing_user)
+        crud.sync_user_busy_rows(db, existing_user)
 
         # ✅ Generate invite token again (re-invite)
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        token_data = {"sub": existing_user.email, "role": existing_user.role.name, "exp": expire}
-        token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
-
-        # ✅ Send email properly (token only)
-        send_invite_email(existing_user.email, token)
-
-        return format_user_response(existing_user)
+        token = _invite_token(existing_user)
+        outbox.enqueue_invite_email(db, existing_user.email, token)
+        db.commit()
+        cache.invalidate_user(existing_user.id)
+        db.refresh(existing_user)
+        return format_user_response(existing_user), token
 
     # ✅ Create new invited user with temporary password
-    temp_password = secrets.token_urlsafe(16)
-    hashed_temp = auth.get_password_hash(temp_password)
-
     new_user = models.User(
         email=user_invite.email,
         name=user_invite.email.split("@")[0],
@@ -241,67 +299,77 @@ def invite_user(
         role=role_obj,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
 
     # ✅ Generate invite token
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    token_data = {"sub": new_user.email, "role": new_user.role.name, "exp": expire}
-    token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
-
-    # ✅ Send email properly (token only)
-    send_invite_email(new_user.email, token)
-
-    # Debugging prints (optional)
-    print(f"✅ Invite sent to: {new_user.email}")
-    print(f"🔗 Invite link: http://localhost:3000/register?token={token}")
-
-    return format_user_response(new_user)
+    token = _invite_token(new_user)
+    outbox.enqueue_invite_email(db, new_user.email, token)
+    db.commit()
+    cache.invalidate_directory()
+    db.refresh(new_user)
+    return format_user_response(new_user), token
 
 
 @router.post("/register-from-invite", response_model=schemas.UserOut)
-def register_from_invite(
+async def register_from_invite(
     data: dict,
     db: Session = Depends(get_db)
 ):
-    token = data.get("token")
+    email, role_name = _decode_invite(data.get("token"))
     password = data.get("password")
-    name = data.get("name")
+    if not password:
+        raise HTTPException(status_code=400, detail="Password is required")
+
+    # Unauthenticated endpoint: only a pending invite is worth a bcrypt hash
+    await run_db(db, _pending_invitee, email)
+    hashed_pw = await run_in_threadpool(auth.get_password_hash, password)
+    return await run_db(db, _register_from_invite, email, role_name, data.get("name"), hashed_pw)
+
 
+def _decode_invite(token: Optional[str]):
+    if not token:
+        raise HTTPException(status_code=400, detail="Invalid or expired token")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        role_name = payload.get("role")
     except JWTError:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
+    return payload.get("sub"), payload.get("role")
+
 
+def _pending_invitee(db: Session, email: str) -> models.User:
     db_user = crud.get_user_by_email(db, email)
     if not db_user:
         raise HTTPException(status_code=404, detail="Invite not found or invalid")
 
     if db_user.hashed_password:
         raise HTTPException(status_code=400, detail="Account already activated")
+    return db_user
+
+
+def _register_from_invite(db: Session, email: str, role_name: str, name: str, hashed_pw: str):
+    db_user = _pending_invitee(db, email)
 
     # set fields and assign Role object
     db_user.name = name
-    db_user.hashed_password = auth.get_password_hash(password)
+    db_user.hashed_password = hashed_pw
     role_obj = db.query(models.Role).filter(models.Role.name == role_name).first()
     if role_obj:
         db_user.role = role_obj
+        crud.sync_user_busy_rows(db, db_user)
 
     db.commit()
+    cache.invalidate_user(db_user.id)
     db.refresh(db_user)
     return format_user_response(db_user)
 
 
 @router.get("/me", response_model=schemas.UserOut)
-def get_me(current_user: models.User = Depends(auth.get_current_user)):
+async def get_me(current_user: models.User = Depends(auth.get_current_user)):
     # current_user should already be loaded with role+permissions by auth.get_current_user,
     # but to be safe ensure they are serializable via format_user_response
     return format_user_response(current_user)
 
 @router.put("/me", response_model=schemas.UserOut)
-def update_me(
+async def update_me(
     user_update: schemas.UserUpdate,
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db),
@@ -311,13 +379,35 @@ def update_me(
     - Email can be changed without password verification
     - Only password changes require current password
     """
-    # Get the user from the current session
-    db_user = db.query(models.User).filter(
-        models.User.id == current_user.id
-    ).first()
-    
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    new_hash = None
+    # Update password if provided (REQUIRES current password verification)
+    if user_update.new_password:
+        if not user_update.current_password:
+            raise HTTPException(
+                status_code=400, 
+                detail="Current password is required to change password"
+            )
+
+        # the cached principal has no hash: it loads on first access
+        hashed = await run_db(db, lambda _: current_user.hashed_password)
+        if not await run_in_threadpool(
+            auth.verify_password, user_update.current_password, hashed
+        ):
+            raise HTTPException(status_code=400, detail="Current password is incorrect")
+
+        new_hash = await run_in_threadpool(auth.get_password_hash, user_update.new_password)
+
+    return await run_db(db, _update_me, current_user, user_update, new_hash)
+
+
+def _update_me(
+    db: Session,
+    current_user: models.User,
+    user_update: schemas.UserUpdate,
+    new_hash: Optional[str],
+):
+    # current_user already lives in this request's session (no re-query)
+    db_user = current_user
     
     updated = False
     
@@ -346,24 +436,16 @@ def update_me(
         db_user.name = user_update.name
         updated = True
     
-    # Update password if provided (REQUIRES current password verification)
-    if user_update.new_password:
-        if not user_update.current_password:
-            raise HTTPException(
-                status_code=400, 
-                detail="Current password is required to change password"
-            )
-        
-        if not auth.verify_password(user_update.current_password, db_user.hashed_password):
-            raise HTTPException(status_code=400, detail="Current password is incorrect")
-        
-        db_user.hashed_password = auth.get_password_hash(user_update.new_password)
+    # Password already verified and hashed by the route
+    if new_hash:
+        db_user.hashed_password = new_hash
         updated = True
     
     if not updated:
         raise HTTPException(status_code=400, detail="No fields to update")
     
     db.commit()
+    cache.invalidate_user(db_user.id)
     db.refresh(db_user)
     
     return format_user_response(db_user)
\ No newline at end of file
@@ -1,6 +1,19 @@
-from pydantic import BaseModel, EmailStr, model_validator
-from datetime import datetime
-from typing import List, Optional, Dict
+from pydantic import BaseModel, EmailStr, Field, model_validator, field_validator
+from datetime import datetime, time, timezone
+from typing import List, Optional, Dict, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.utils.recurrence import normalize_rule, parse_rule
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    Event columns are naive UTC; keep comparisons against them valid.
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
 # ─────────────── Permission Schema ─────────────── #
 
@@ -88,12 +101,45 @@ class EventBase(BaseModel):
     start_time: datetime
     end_time: datetime
 
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def normalize_times(cls, value: datetime):
+        return to_naive_utc(value)
+
+    # events.during is a [start, end) range: reversed times fail at flush
+    @model_validator(mode="after")
+    def validate_time_order(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
     class Config:
         from_attributes = True
 
 
 class EventCreate(EventBase):
     participants: Optional[List[int]] = []
+    # RRULE subset, e.g. "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=12"
+    recurrence: Optional[str] = None
+
+    @field_validator("recurrence")
+    @classmethod
+    def validate_recurrence(cls, value: Optional[str]):
+        if not value:
+            return None
+        parse_rule(value)
+        return normalize_rule(value)
+
+
+class EventBulkItem(EventCreate):
+    # reported per item by the bulk check instead of failing the request
+    @model_validator(mode="after")
+    def validate_time_order(self):
+        return self
+
+
+class OccurrenceUpdate(EventBase):
+    title: Optional[str] = None
 
 
 class EventOut(EventBase):
@@ -102,6 +148,14 @@ class EventOut(EventBase):
     status: str
     cancellation_reason: Optional[str] = None
     participants: List[UserOut] = []
+    recurrence: Optional[str] = None
+    # set on expanded occurrences: the rule's start for this one
+    occurrence_start: Optional[datetime] = None
+
+    # stored rows are returned as they are
+    @model_validator(mode="after")
+    def validate_time_order(self):
+        return self
 
     class Config:
         from_attributes = True
@@ -120,10 +174,168 @@ class EventOut(EventBase):
             user_id=obj.user_id,
             status=obj.status,
             cancellation_reason=obj.cancellation_reason,
-            participants=participants
+            participants=participants,
+            recurrence=getattr(obj, "recurrence", None),
+            occurrence_start=getattr(obj, "occurrence_start", None),
         )
 
 
+class EventBulkResult(BaseModel):
+    index: int
+    status: str  # created | conflict | invalid
+    event_id: Optional[int] = None
+    detail: Optional[Union[str, List[Dict]]] = None
+
+
+class EventBulkResponse(BaseModel):
+    created: int
+    rejected: int
+    results: List[EventBulkResult]
+
+
+class FreeBusyRequest(BaseModel):
+    user_ids: List[int]
+    start: datetime
+    end: datetime
+
+    @field_validator("start", "end")
+    @classmethod
+    def normalize_times(cls, value: datetime):
+        return to_naive_utc(value)
+
+    @model_validator(mode="after")
+    def validate_window(self):
+        if self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+
+class TimeInterval(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class UserFreeBusy(BaseModel):
+    user_id: int
+    busy: List[TimeInterval] = []
+
+
+class FreeBusyResponse(BaseModel):
+    start: datetime
+    end: datetime
+    users: List[UserFreeBusy]
+
+
+class WorkingHoursIn(BaseModel):
+    start: time = time(9, 0)
+    end: time = time(17, 0)
+    weekdays: List[int] = [0, 1, 2, 3, 4]  # 0 = Monday
+    timezone: str = "UTC"
+
+    @field_validator("weekdays")
+    @classmethod
+    def validate_weekdays(cls, value: List[int]):
+        if not value or any(day not in range(7) for day in value):
+            raise ValueError("weekdays take values 0 (Monday) to 6 (Sunday)")
+        return value
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, value: str):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone '{value}'")
+        return value
+
+    @model_validator(mode="after")
+    def validate_hours(self):
+        if self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+
+class FindSlotRequest(BaseModel):
+    participants: List[int]
+    duration_minutes: int = Field(ge=5, le=24 * 60)
+    start: datetime
+    end: datetime
+    k: int = Field(5, ge=1, le=50)
+    # slot starts are aligned to this grid (e.g. :00, :15, :30, :45)
+    step_minutes: int = Field(15, ge=5, le=24 * 60)
+    working_hours: Optional[WorkingHoursIn] = None
+
+    @field_validator("start", "end")
+    @classmethod
+    def normalize_times(cls, value: datetime):
+        return to_naive_utc(value)
+
+    @model_validator(mode="after")
+    def validate_window(self):
+        if self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+
+class FindSlotResponse(BaseModel):
+    duration_minutes: int
+    slots: List[TimeInterval]
+
+
+class MeetingRequest(BaseModel):
+    title: str
+    participants: List[int] = []
+    duration_minutes: int = Field(ge=5, le=24 * 60)
+    # the meeting must fit inside [start, end)
+    start: datetime
+    end: datetime
+    priority: int = 0  # higher is placed first
+
+    @field_validator("start", "end")
+    @classmethod
+    def normalize_times(cls, value: datetime):
+        return to_naive_utc(value)
+
+    @model_validator(mode="after")
+    def validate_window(self):
+        if (self.end - self.start).total_seconds() < self.duration_minutes * 60:
+            raise ValueError("the window is shorter than the meeting")
+        return self
+
+
+class AutoScheduleRequest(BaseModel):
+    meetings: List[MeetingRequest]
+    step_minutes: int = Field(15, ge=5, le=24 * 60)
+    working_hours: Optional[WorkingHoursIn] = None
+    # create the placed meetings (all or nothing) instead of only proposing
+    commit: bool = False
+
+
+class AutoScheduleResult(BaseModel):
+    index: int
+    title: str
+    status: str  # placed | unplaced
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    event_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class AutoScheduleResponse(BaseModel):
+    placed: int
+    unplaced: int
+    committed: bool
+    results: List[AutoScheduleResult]
+
+
+class EventChanges(BaseModel):
+    cursor: int
+    # every changed event, including series with no occurrence in the window
+    updated: List[int] = []
+    events: List[EventOut] = []
+    removed: List[int] = []
+
+
 # ─────────────── Update Permission Schema ─────────────── #
 
 class UserPermissionUpdate(BaseModel):
@@ -0,0 +1,62 @@
+# app/utils/autoschedule.py
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.utils.busy_index import UserIntervals
+from app.utils.slots import WorkingHours, find_slots
+
+
+class Meeting(NamedTuple):
+    title: str
+    user_ids: Sequence[int]  # regular-role attendees (the only ones who can clash)
+    duration: timedelta
+    start: datetime  # window the meeting must fit in
+    end: datetime
+    priority: int = 0
+
+
+def _placement_order(meetings: List[Meeting]) -> List[int]:
+    """
+    Highest priority first; among equals the most constrained meeting
+    (more attendees, less slack in its window) goes first, so it isn't
+    crowded out by flexible ones.
+    """
+    return sorted(
+        range(len(meetings)),
+        key=lambda i: (
+            -meetings[i].priority,
+            -len(meetings[i].user_ids),
+            (meetings[i].end - meetings[i].start) - meetings[i].duration,
+            i,
+        ),
+    )
+
+
+def place_meetings(
+    meetings: List[Meeting],
+    busy: Dict[int, UserIntervals],
+    step: timedelta,
+    hours: Optional[WorkingHours] = None,
+) -> List[Optional[Tuple[datetime, datetime]]]:
+    """
+    Greedy placement: each meeting, in _placement_order, takes the earliest
+    step-aligned slot in its window where all its attendees are free, then
+    books that slot in their interval indexes for the meetings after it.
+
+    `busy` holds every attendee's existing intervals and is updated in
+    place. Returns one (start, end) per meeting, None if it didn't fit.
+    """
+    placed: List[Optional[Tuple[datetime, datetime]]] = [None] * len(meetings)
+    for i in _placement_order(meetings):
+        meeting = meetings[i]
+        busy_lists = [
+            busy[user_id].overlapping(meeting.start, meeting.end) for user_id in meeting.user_ids
+        ]
+        found = find_slots(busy_lists, meeting.start, meeting.end, meeting.duration, 1, step, hours)
+        if not found:
+            continue
+        placed[i] = found[0]
+        for user_id in meeting.user_ids:
+            # negative keys never clash with event ids
+            busy[user_id].add(*found[0], -(i + 1))
+    return placed
@@ -0,0 +1,217 @@
+# app/utils/busy_index.py
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import BUSY_INDEX_TTL_SECONDS
+
+
+class UserIntervals:
+    """
+    Sorted busy intervals of ONE user (active events, owned or joined).
+
+    Intervals are kept ordered by start time. Because a user can have
+    overlapping events (admins are never blocked), a lookup scans back
+    by the longest duration seen, which keeps it O(log n + k).
+    """
+
+    def __init__(self, loaded_at: float):
+        self.loaded_at = loaded_at
+        self.starts: List[datetime] = []
+        self.items: List[Tuple[datetime, datetime, int]] = []
+        self.by_event: Dict[int, List[Tuple[datetime, datetime, int]]] = {}
+        self.max_duration = timedelta(0)
+
+    def add(self, start: datetime, end: datetime, event_id: int):
+        """
+        The event's interval becomes [start, end) (replacing any it had).
+        """
+        self.set_event(event_id, [(start, end)])
+
+    def set_event(self, event_id: int, spans: List[Tuple[datetime, datetime]]):
+        """
+        The event's intervals become `spans`: one per occurrence for a
+        recurring event, which would otherwise replace each other in add().
+        """
+        self.remove(event_id)
+        items = []
+        for start, end in spans:
+            item = (start, end, event_id)
+            i = bisect_left(self.items, item)
+            self.items.insert(i, item)
+            self.starts.insert(i, start)
+            items.append(item)
+            if end - start > self.max_duration:
+                self.max_duration = end - start
+        self.by_event[event_id] = items
+
+    def remove(self, event_id: int):
+        for item in self.by_event.pop(event_id, ()):
+            i = bisect_left(self.items, item)
+            del self.items[i]
+            del self.starts[i]
+
+    def overlapping(
+        self,
+        start: datetime,
+        end: datetime,
+        exclude_event_id: Optional[int] = None,
+    ) -> List[Tuple[datetime, datetime, int]]:
+        lo = bisect_left(self.starts, start - self.max_duration)
+        hi = bisect_left(self.starts, end)
+        return [
+            item
+            for item in self.items[lo:hi]
+            if item[1] > start and item[2] != exclude_event_id
+        ]
+
+
+class BusyIndex:
+    """
+    Process-local cache of every user's busy intervals (single events;
+    recurring series are expanded per query by crud).
+
+    A user's intervals are loaded from the database on first use and then
+    kept in sync by crud after each commit (create / update / cancel).
+    Entries expire after `ttl` seconds so writes made by other worker
+    processes are picked up.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._users: Dict[int, UserIntervals] = {}
+        self._lock = threading.Lock()
+        # bumped on every mutation, used to drop loads that raced a write
+        self._epoch = 0
+
+    def _get(self, user_id: int) -> Optional[UserIntervals]:
+        entry = self._users.get(user_id)
+        if entry and time.monotonic() - entry.loaded_at < self.ttl:
+            return entry
+        return None
+
+    def _load_many(self, db: Session, user_ids: List[int]) -> Dict[int, UserIntervals]:
+        """
+        Load several users in ONE grouped query (owned UNION ALL joined events).
+        """
+        with self._lock:
+            epoch = self._epoch
+
+        owned = select(
+            models.Event.user_id.label("uid"),
+            models.Event.id,
+            models.Event.start_time,
+            models.Event.end_time,
+        ).where(
+            models.Event.user_id.in_(user_ids),
+            models.active_single_event,
+        )
+        joined = (
+            select(
+                models.event_participants.c.user_id.label("uid"),
+                models.Event.id,
+                models.Event.start_time,
+                models.Event.end_time,
+            )
+            .join(models.Event, models.Event.id == models.event_participants.c.event_id)
+            .where(
+                models.event_participants.c.user_id.in_(user_ids),
+                models.active_single_event,
+            )
+        )
+        rows = db.execute(union_all(owned, joined)).all()
+
+        loaded_at = time.monotonic()
+        entries = {user_id: UserIntervals(loaded_at) for user_id in user_ids}
+        for user_id, event_id, start, end in rows:
+            entries[user_id].add(start, end, event_id)
+
+        with self._lock:
+            # a write landed while we were reading; don't cache a stale view
+            if self._epoch == epoch:
+                self._users.update(entries)
+        return entries
+
+    def conflicts_many(
+        self,
+        db: Session,
+        user_ids: Iterable[int],
+        start: datetime,
+        end: datetime,
+        exclude_event_id: Optional[int] = None,
+    ) -> Dict[int, List[Tuple[datetime, datetime, int]]]:
+        """
+        Overlapping intervals per user; users without a conflict are omitted.
+        All cold users are loaded together, so this costs at most one query.
+        """
+        entries = {}
+        missing = []
+        with self._lock:
+            for user_id in set(user_ids):
+                entry = self._get(user_id)
+                if entry:
+                    entries[user_id] = entry
+                else:
+                    missing.append(user_id)
+
+        if missing:
+            entries.update(self._load_many(db, missing))
+
+        result = {}
+        with self._lock:
+            for user_id, entry in entries.items():
+                overlapping = entry.overlapping(start, end, exclude_event_id)
+                if overlapping:
+                    result[user_id] = overlapping
+        return result
+
+    def conflicts(
+        self,
+        db: Session,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+        exclude_event_id: Optional[int] = None,
+    ) -> List[Tuple[datetime, datetime, int]]:
+        return self.conflicts_many(db, [user_id], start, end, exclude_event_id).get(
+            user_id, []
+        )
+
+    def add_event(self, event: models.Event, user_ids: Iterable[int]):
+        with self._lock:
+            self._epoch += 1
+            for user_id in user_ids:
+                entry = self._users.get(user_id)
+                if entry:
+                    entry.add(event.start_time, event.end_time, event.id)
+
+    def remove_event(self, event_id: int, user_ids: Iterable[int]):
+        with self._lock:
+            self._epoch += 1
+            for user_id in user_ids:
+                entry = self._users.get(user_id)
+                if entry:
+                    entry.remove(event_id)
+
+    def forget(self, user_ids: Iterable[int]):
+        """
+        Drop users whose cached view turned out to be stale.
+        """
+        with self._lock:
+            self._epoch += 1
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._users.clear()
+
+
+busy_index = BusyIndex(ttl=BUSY_INDEX_TTL_SECONDS)
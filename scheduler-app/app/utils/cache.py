@@ -0,0 +1,272 @@
+# app/utils/cache.py
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (
+    CACHE_URL,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    DB_REPLICA_URLS,
+    REPLICA_STICKY_SECONDS,
+    WEB_CONCURRENCY,
+)
+from app.utils.metrics import counter
+
+try:
+    import redis
+except ImportError:  # optional: only needed for a shared cache
+    redis = None
+
+
+def blocking_io(fn, *args, **kwargs):
+    """
+    Run a blocking network call (Redis) from sync code. Under DB_ASYNC,
+    crud and auth run inside run_db's greenlet ON the event loop thread:
+    there the call goes to a thread and is awaited through the same
+    greenlet bridge as the database I/O. Anywhere else (threadpool) it
+    simply blocks.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return fn(*args, **kwargs)
+    return await_only(asyncio.to_thread(fn, *args, **kwargs))
+
+
+class LRUCache:
+    """
+    In-process cache: least-recently-used eviction plus a per-entry TTL.
+    Version counters live outside the LRU so they are never evicted.
+    Nothing is shared: other workers never see these entries or versions.
+    """
+    shared = False
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # versions restart at 0 with the process; keeps old ETags from matching
+        self.instance_id = uuid.uuid4().hex
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self, name: str) -> int:
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def bump_version(self, name: str):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """
+    Shared cache for several workers/hosts. Values must be JSON-serializable.
+    """
+    shared = True
+
+    def __init__(self, url: str, ttl: float):
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+        self.instance_id = "redis"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = blocking_io(self._redis.get, f"cache:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any):
+        blocking_io(self._redis.set, f"cache:{key}", json.dumps(value), ex=int(self.ttl))
+
+    def get_version(self, name: str) -> int:
+        return int(blocking_io(self._redis.get, f"version:{name}") or 0)
+
+    def bump_version(self, name: str):
+        blocking_io(self._redis.incr, f"version:{name}")
+
+    def clear(self):
+        for key in self._redis.scan_iter("cache:*"):
+            self._redis.delete(key)
+
+
+def _make_backend():
+    if CACHE_URL:
+        if redis is None:
+            raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+        return RedisCache(CACHE_URL, CACHE_TTL_SECONDS)
+    if DB_REPLICA_URLS:
+        # read-your-writes pins (pin_primary) must reach every worker, and
+        # the LRU would let ordinary cache traffic evict them
+        raise RuntimeError("DB_REPLICA_URLS is set but CACHE_URL is not: replicas need a shared cache")
+    return LRUCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+backend = _make_backend()
+
+# Version-keyed caching is only sound when every worker bumps and reads the
+# same counters: a write handled by another worker would otherwise leave this
+# worker's version (and the pages/ETags built on it) unchanged forever.
+versions_shared = backend.shared or WEB_CONCURRENCY <= 1
+if not versions_shared:
+    print(
+        f"⚠️ WEB_CONCURRENCY={WEB_CONCURRENCY} without a shared CACHE_URL: "
+        "response caching, ETags and the principal cache are disabled"
+    )
+
+cache_hits = counter("response_cache_hits_total", "Responses served from cache")
+cache_misses = counter("response_cache_misses_total", "Responses rebuilt on a cache miss")
+
+
+async def call(fn, *args):
+    """
+    Cache work from an async route: the shared backend does network I/O,
+    so it runs in the threadpool; the in-process LRU is called directly.
+    """
+    if backend.shared:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+def lookup(key: str) -> Optional[Any]:
+    value = backend.get(key)
+    if value is None:
+        cache_misses.inc()
+    else:
+        cache_hits.inc()
+    return value
+
+
+def store(key: str, value: Any):
+    backend.set(key, value)
+
+
+# ---------- calendar versions ----------
+# Cache keys embed the user's calendar version, so bumping it invalidates
+# every cached window of that user at once (old entries just age out).
+
+def calendar_version(user_id: int) -> int:
+    return backend.get_version(f"calendar:{user_id}")
+
+
+def invalidate_calendars(user_ids: Iterable[int]):
+    user_ids = set(user_ids)
+    for user_id in user_ids:
+        backend.bump_version(f"calendar:{user_id}")
+    pin_primary(user_ids)
+
+
+# ---------- user directory version ----------
+# Bumped whenever any user's name/contact/role changes (GET /users/ and the
+# participant details embedded in event lists depend on it).
+
+def directory_version() -> int:
+    return backend.get_version("directory")
+
+
+def invalidate_directory():
+    backend.bump_version("directory")
+    # everyone's pages embed user details
+    pin_primary(None)
+
+
+# ---------- principals ----------
+# auth caches each user's identity (role + permissions) under their
+# principal version; any change to the user bumps it.
+
+def principal_version(user_id: int) -> int:
+    return backend.get_version(f"principal:{user_id}")
+
+
+def invalidate_user(user_id: int):
+    """
+    A user's profile or role changed: drop their cached principal and
+    everything that embeds user details.
+    """
+    backend.bump_version(f"principal:{user_id}")
+    invalidate_directory()
+
+
+# ---------- read-your-writes ----------
+# After a write, the affected users read from the primary for a short
+# window, so a lagging replica can't serve (and get cached under the new
+# version) the state from before the write. Replicas require CACHE_URL, so
+# pins live in redis, where every worker sees them.
+
+def pin_primary(user_ids: Optional[Iterable[int]]):
+    """
+    Pin `user_ids` (or everyone, when None) to the primary.
+    """
+    if not DB_REPLICA_URLS:
+        return
+    until = time.time() + REPLICA_STICKY_SECONDS
+    keys = ["pin:*"] if user_ids is None else [f"pin:{user_id}" for user_id in user_ids]
+    for key in keys:
+        backend.set(key, until)
+
+
+def is_pinned(user_id: Optional[int]) -> bool:
+    now = time.time()
+    return any(
+        (backend.get(key) or 0) > now
+        for key in ("pin:*", f"pin:{user_id}")
+    )
+
+
+# ---------- ETags ----------
+
+def make_etag(*parts) -> str:
+    raw = ":".join(str(p) for p in (backend.instance_id, *parts))
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True when the client's If-None-Match already names this ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def stats() -> dict:
+    total = cache_hits.value + cache_misses.value
+    return {
+        "backend": type(backend).__name__,
+        "hits": cache_hits.value,
+        "misses": cache_misses.value,
+        "hit_ratio": round(cache_hits.value / total, 4) if total else None,
+    }
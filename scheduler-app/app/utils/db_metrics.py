@@ -0,0 +1,182 @@
+# app/utils/db_metrics.py
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import SQL_QUERY_BUDGET, SQL_QUERY_BUDGET_STRICT, SQL_REPEAT_WARNING
+from app.utils.metrics import collect, counter, current_route, histogram
+
+logger = logging.getLogger("app.sql")
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout, including the wait for a free slot on a full
+    pool, and counts checkouts per route and pool timeouts.
+    Pools are told apart by `pool_logging_name` ("primary", "replica0", ...).
+    """
+
+    def _do_get(self):
+        pool = self._orig_logging_name or "default"
+        route = current_route.get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            counter(
+                "db_pool_timeouts_total", "Checkouts that hit pool_timeout", pool=pool, route=route
+            ).inc()
+            raise
+        finally:
+            histogram(
+                "db_pool_wait_seconds", "Time to obtain a pooled connection", pool=pool
+            ).observe(time.perf_counter() - started)
+            counter(
+                "db_pool_checkouts_total", "Connection checkouts", pool=pool, route=route
+            ).inc()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+
+
+def pool_stats(engines: Dict[str, Engine]) -> dict:
+    """
+    Live pool state plus wait histograms, checkouts per route and timeouts.
+    """
+    waits = {m.labels["pool"]: m.snapshot() for m in collect("db_pool_wait_seconds")}
+
+    checkouts: Dict[str, Dict[str, int]] = {}
+    for metric in collect("db_pool_checkouts_total"):
+        per_route = checkouts.setdefault(metric.labels["pool"], {})
+        per_route[metric.labels["route"]] = metric.value
+
+    timeouts: Dict[str, int] = {}
+    for metric in collect("db_pool_timeouts_total"):
+        pool = metric.labels["pool"]
+        timeouts[pool] = timeouts.get(pool, 0) + metric.value
+
+    return {
+        name: {
+            **pool_status(engine),
+            "wait_seconds": waits.get(name),
+            "checkouts_by_route": checkouts.get(name, {}),
+            "timeouts": timeouts.get(name, 0),
+        }
+        for name, engine in engines.items()
+    }
+
+
+# ---------- per-request SQL statistics ----------
+
+class QueryBudgetExceeded(RuntimeError):
+    """
+    Raised in strict mode when a route issues more statements than its budget.
+    """
+
+
+class QueryStats:
+    """
+    Statements issued while serving one request. The object is shared by
+    reference with the threadpool / greenlet running the db work, so the
+    engine hooks below can add to it from there.
+    """
+
+    def __init__(self, budget: int = SQL_QUERY_BUDGET):
+        self.budget = budget
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = StatementCounter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    @property
+    def repeated(self) -> int:
+        """
+        Statements that re-ran with the same SQL (the N+1 signature).
+        """
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-DB-Queries": str(self.count),
+            "X-DB-Time-Ms": f"{self.seconds * 1000:.1f}",
+            "X-DB-Repeated": str(self.repeated),
+        }
+
+    def check(self, route: str):
+        """
+        Log the request's SQL; enforce the budget (raises in strict mode).
+        """
+        logger.info(
+            "%s: %d queries, %.1f ms, %d repeated",
+            route, self.count, self.seconds * 1000, self.repeated,
+        )
+        for statement, n in self.statements.items():
+            if n >= SQL_REPEAT_WARNING:
+                logger.warning("%s: possible N+1, ran %d times: %s", route, n, statement)
+
+        if self.count > self.budget:
+            message = f"{route} issued {self.count} queries (budget {self.budget})"
+            if SQL_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar("current_queries", default=None)
+
+
+def query_budget(limit: int):
+    """
+    Route dependency declaring how many statements the route may issue:
+        @router.get("/", dependencies=[Depends(query_budget(3))])
+    """
+    async def set_budget():
+        stats = current_queries.get()
+        if stats is not None:
+            stats.budget = limit
+    return set_budget
+
+
+def track_queries(engine: Engine):
+    """
+    Feed every statement run on `engine` into the current request's stats.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        stats = current_queries.get()
+        if stats is not None:
+            started = getattr(context, "query_started", None)
+            stats.record(statement, time.perf_counter() - started if started else 0.0)
@@ -1,20 +1,261 @@
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+from typing import List, NamedTuple, Optional
 
-def send_invite_email(to_email: str, invite_token: str):
-    sender_email = os.getenv("EMAIL_HOST_USER")
-    sender_password = os.getenv("EMAIL_HOST_PASSWORD")
-    smtp_host = os.getenv("EMAIL_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("EMAIL_PORT", "465"))
+from app.config import (
+    EMAIL_BACKEND,
+    SMTP_MAX_CONNECTIONS,
+    SMTP_MAX_MESSAGES_PER_CONNECTION,
+    SMTP_IDLE_SECONDS,
+)
+from app.utils.metrics import counter, histogram
+
+messages_sent = counter("email_messages_sent_total", "Messages accepted by the mail server")
+send_failures = counter("email_send_failures_total", "Messages the mail server did not accept")
+connections_opened = counter("email_smtp_connections_opened_total", "SMTP connections opened (TLS + login)")
+send_seconds = histogram("email_send_seconds", "Time to hand one message to the mail server")
+
+
+class Email(NamedTuple):
+    to_email: str
+    subject: str
+    text: str
+    html: Optional[str] = None
 
-    invite_link = f"http://localhost:3000/register?token={invite_token}"
 
-    message = MIMEMultipart("alternative")
-    message["Subject"] = "You're invited!"
-    message["From"] = sender_email
+def build_message(to_email: str, subject: str, text: str, html: Optional[str] = None):
+    message = MIMEMultipart("alternative") if html else MIMEText(text)
+    message["Subject"] = subject
+    message["From"] = os.getenv("EMAIL_HOST_USER")
     message["To"] = to_email
+    if html:
+        message.attach(MIMEText(text, "plain"))
+        message.attach(MIMEText(html, "html"))
+    return message
+
+
+class _Connection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP_SSL connections reused across messages, so a
+    fan-out pays for one TLS handshake + login per connection instead of
+    per recipient. At most `max_connections` are open at once; callers
+    beyond that wait. A connection is retired after `max_messages` or
+    when it sat idle longer than `idle_seconds`.
+    """
+
+    def __init__(self, max_connections: int, max_messages: int, idle_seconds: float):
+        self.max_connections = max_connections
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _Connection:
+        smtp_host = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+        smtp_port = int(os.getenv("EMAIL_PORT", "465"))
+        server = smtplib.SMTP_SSL(smtp_host, smtp_port)
+        try:
+            server.login(os.getenv("EMAIL_HOST_USER"), os.getenv("EMAIL_HOST_PASSWORD"))
+        except Exception:
+            server.close()
+            raise
+        connections_opened.inc()
+        return _Connection(server)
+
+    def _take_idle(self) -> Optional[_Connection]:
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if time.monotonic() - conn.last_used < self.idle_seconds:
+                    return conn
+                conn.close()
+        return None
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a live connection for one or more messages.
+        """
+        with self._slots:
+            conn = self._take_idle() or self._connect()
+            try:
+                yield conn
+            except BaseException:
+                # the session's state is unknown: don't hand it out again
+                conn.close()
+                raise
+            conn.last_used = time.monotonic()
+            if conn.sent >= self.max_messages:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class SMTPBackend:
+    """
+    Delivers through the shared connection pool. send() raises on failure
+    so the outbox can retry; send_many() reports per-message outcomes.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool):
+        self.pool = pool
+
+    def _send_on(self, conn: _Connection, message: Email):
+        started = time.perf_counter()
+        sender_email = os.getenv("EMAIL_HOST_USER")
+        mime = build_message(message.to_email, message.subject, message.text, message.html)
+        conn.server.sendmail(sender_email, message.to_email, mime.as_string())
+        conn.sent += 1
+        send_seconds.observe(time.perf_counter() - started)
+
+    def _send_batch(self, messages: List[Email]) -> List[Optional[Exception]]:
+        """
+        Send on one borrowed connection, reconnecting if the server drops it.
+        """
+        results: List[Optional[Exception]] = []
+        pending = list(messages)
+        reconnects = 0
+        while pending:
+            try:
+                with self.pool.connection() as conn:
+                    while pending and conn.sent < self.pool.max_messages:
+                        try:
+                            self._send_on(conn, pending[0])
+                            messages_sent.inc()
+                            results.append(None)
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as exc:
+                            # this message only; the session is still fine
+                            send_failures.inc()
+                            results.append(exc)
+                        pending.pop(0)
+                        reconnects = 0
+            except smtplib.SMTPServerDisconnected as exc:
+                reconnects += 1
+                if reconnects <= 2:
+                    continue  # a pooled connection went stale: open a fresh one
+                send_failures.inc(len(pending))
+                results.extend([exc] * len(pending))
+                break
+            except Exception as exc:
+                # can't connect / log in: everything left fails this round
+                send_failures.inc(len(pending))
+                results.extend([exc] * len(pending))
+                break
+        return results
+
+    def send(self, to_email: str, subject: str, text: str, html: Optional[str] = None):
+        error = self.send_many([Email(to_email, subject, text, html)])[0]
+        if error is not None:
+            raise error
+
+    def send_many(self, messages: List[Email]) -> List[Optional[Exception]]:
+        """
+        Spread messages over up to max_connections sessions in parallel.
+        Returns one entry per message: None if sent, else the exception.
+        """
+        if not messages:
+            return []
+        workers = min(self.pool.max_connections, len(messages))
+        if workers == 1:
+            return self._send_batch(messages)
+        chunks = [messages[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(self._send_batch, chunks))
+
+        # undo the round-robin split
+        results: List[Optional[Exception]] = [None] * len(messages)
+        for i, chunk_result in enumerate(chunk_results):
+            results[i::workers] = chunk_result
+        return results
+
+
+class ConsoleBackend:
+    """
+    Prints mail instead of sending it (local development).
+    """
+
+    def send(self, to_email: str, subject: str, text: str, html: Optional[str] = None):
+        print(f"📧 To: {to_email}\nSubject: {subject}\n\n{text}\n")
+        messages_sent.inc()
+
+    def send_many(self, messages: List[Email]) -> List[Optional[Exception]]:
+        for message in messages:
+            self.send(*message)
+        return [None] * len(messages)
+
+
+class MemoryBackend(ConsoleBackend):
+    """
+    Local SMTP stand-in for tests: keeps every message in `sent`.
+    """
+
+    def __init__(self):
+        self.sent: List[dict] = []
+
+    def send(self, to_email: str, subject: str, text: str, html: Optional[str] = None):
+        self.sent.append({"to": to_email, "subject": subject, "text": text, "html": html})
+        messages_sent.inc()
+
+
+def _make_backend():
+    if EMAIL_BACKEND == "smtp":
+        return SMTPBackend(
+            SMTPConnectionPool(SMTP_MAX_CONNECTIONS, SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_IDLE_SECONDS)
+        )
+    if EMAIL_BACKEND == "console":
+        return ConsoleBackend()
+    if EMAIL_BACKEND == "memory":
+        return MemoryBackend()
+    raise RuntimeError(f"Unknown EMAIL_BACKEND '{EMAIL_BACKEND}'")
+
+
+backend = _make_backend()
+
+
+def stats() -> dict:
+    opened = connections_opened.value
+    return {
+        "backend": type(backend).__name__,
+        "sent": messages_sent.value,
+        "failed": send_failures.value,
+        "connections_opened": opened,
+        "messages_per_connection": round(messages_sent.value / opened, 2) if opened else None,
+        "send_seconds": send_seconds.snapshot(),
+    }
+
+
+def invite_email(invite_token: str):
+    """
+    (subject, text, html) of an invitation.
+    """
+    invite_link = f"http://localhost:3000/register?token={invite_token}"
 
     text = f"You've been invited to join the calendar app!\nRegister here: {invite_link}"
     html = f"""
@@ -27,47 +268,38 @@ def send_invite_email(to_email: str, invite_token: str):
       </body>
     </html>
     """
+    return "You're invited!", text, html
+
+
+_ACTION_LABELS = {"updated": "Updated", "cancelled": "Cancelled", "removed": "Removed"}
 
-    message.attach(MIMEText(text, "plain"))
-    message.attach(MIMEText(html, "html"))
-
-    try:
-        with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, to_email, message.as_string())
-        print(f"Invite email sent to {to_email}")
-    except Exception as e:
-        print(f"Error sending invite email to {to_email}: {e}")
-
-def send_event_cancel_email(
-    to_emails: list[str],
-    event_title: str,
-    start_time,
-    end_time,
-    cancelled_by: str,
-):
-    sender_email = os.getenv("EMAIL_HOST_USER")
-    sender_password = os.getenv("EMAIL_HOST_PASSWORD")
-    smtp_host = os.getenv("EMAIL_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("EMAIL_PORT", "465"))
-
-    subject = f"Event Cancelled: {event_title}"
-
-    body = f"""
-    The following event has been cancelled:
-
-    Title: {event_title}
-    Time: {start_time} - {end_time}
-    Cancelled by: {cancelled_by}
-    """
 
-    for to_email in to_emails:
-        message = MIMEText(body)
-        message["Subject"] = subject
-        message["From"] = sender_email
-        message["To"] = to_email
+def event_changes_email(changes):
+    """
+    (subject, text) telling one recipient about event changes. `changes`
+    have .action/.title/.start_time/.end_time/.changed_by; several become
+    one digest.
+    """
+    if len(changes) == 1:
+        change = changes[0]
+        label = _ACTION_LABELS.get(change.action, change.action.title())
+        if change.action == "removed":
+            intro = "You have been removed from the following event:"
+        else:
+            intro = f"The following event has been {label.lower()}:"
+        body = f"""
+    {intro}
 
-        with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, to_email, message.as_string())
+    Title: {change.title}
+    Time: {change.start_time} - {change.end_time}
+    {label} by: {change.changed_by}
+    """
+        return f"Event {label}: {change.title}", body
 
+    lines = [
+        f"    - {_ACTION_LABELS.get(c.action, c.action.title())}: {c.title} "
+        f"({c.start_time} - {c.end_time}) by {c.changed_by}"
+        for c in changes
+    ]
+    body = "\n    Several of your events changed:\n\n" + "\n".join(lines) + "\n"
+    return f"{len(changes)} changes to your events", body
@@ -0,0 +1,226 @@
+# app/utils/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+
+# seconds; suits connection waits and request/query latencies alike
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """
+    Thread-safe monotonically increasing counter.
+    """
+
+    def __init__(self, name: str, description: str = "", labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class Histogram:
+    """
+    Thread-safe histogram over fixed upper bounds (`le` buckets).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        labels: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.buckets = tuple(sorted(buckets))
+        # last slot counts observations above every bound (+Inf)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """
+        Count, sum and CUMULATIVE bucket counts, keyed by upper bound.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += count
+            cumulative[bound] = running
+        return {"count": running, "sum": round(total, 6), "buckets": cumulative}
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile by linear interpolation inside its bucket
+        (same method as Prometheus' histogram_quantile).
+        """
+        with self._lock:
+            counts = list(self._counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        running = 0
+        lower = 0.0
+        for i, count in enumerate(counts):
+            if i == len(self.buckets):
+                # above the last bound: the best estimate is that bound
+                return self.buckets[-1]
+            upper = self.buckets[i]
+            if running + count >= rank:
+                return lower + (upper - lower) * ((rank - running) / count if count else 0)
+            running += count
+            lower = upper
+        return self.buckets[-1]
+
+
+# "GET /events/" style route of the request being served (set by a
+# middleware in app.main); labels per-route metrics
+current_route: ContextVar[str] = ContextVar("current_route", default="-")
+
+
+class Timings:
+    """
+    Where one request's time went, by phase (auth, db, serialize, total).
+    Phases may overlap (auth includes its own query time).
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def header(self) -> str:
+        """
+        Server-Timing header value, durations in milliseconds.
+        """
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()
+        )
+
+    def observe(self, route: str):
+        for phase, seconds in self.phases.items():
+            histogram(
+                "http_request_duration_seconds",
+                "Request latency by route and phase",
+                route=route,
+                phase=phase,
+            ).observe(seconds)
+
+
+current_timings: ContextVar[Optional[Timings]] = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Add the block's duration to the current request's `phase`.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add(phase, time.perf_counter() - started)
+
+
+# every metric created through counter()/histogram(), by name + labels
+registry: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], object] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, description: str, labels: Dict[str, str], **kwargs):
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        if key not in registry:
+            registry[key] = cls(name, description, labels=labels, **kwargs)
+        return registry[key]
+
+
+def counter(name: str, description: str = "", **labels: str) -> Counter:
+    return _get_or_create(Counter, name, description, labels)
+
+
+def histogram(
+    name: str,
+    description: str = "",
+    buckets: Iterable[float] = DEFAULT_BUCKETS,
+    **labels: str,
+) -> Histogram:
+    return _get_or_create(Histogram, name, description, labels, buckets=buckets)
+
+
+def collect(name: str):
+    """
+    All registered series of one metric name (one per label set).
+    """
+    with _registry_lock:
+        return [metric for (key, _), metric in registry.items() if key == name]
+
+
+
+# ---------- Prometheus text exposition ----------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    Every registered metric in the Prometheus text format (version 0.0.4).
+    """
+    with _registry_lock:
+        metrics = list(registry.values())
+
+    by_name: Dict[str, list] = {}
+    for metric in metrics:
+        by_name.setdefault(metric.name, []).append(metric)
+
+    lines = []
+    for name, series in sorted(by_name.items()):
+        first = series[0]
+        kind = "histogram" if isinstance(first, Histogram) else "counter"
+        lines.append(f"# HELP {name} {_escape(first.description)}")
+        lines.append(f"# TYPE {name} {kind}")
+        for metric in series:
+            if kind == "counter":
+                lines.append(f"{name}{_format_labels(metric.labels)} {metric.value}")
+                continue
+            snapshot = metric.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                labels = _format_labels({**metric.labels, "le": bound})
+                lines.append(f"{name}_bucket{labels} {count}")
+            lines.append(f"{name}_sum{_format_labels(metric.labels)} {snapshot['sum']}")
+            lines.append(f"{name}_count{_format_labels(metric.labels)} {snapshot['count']}")
+    return "\n".join(lines) + "\n"
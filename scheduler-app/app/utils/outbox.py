@@ -0,0 +1,265 @@
+# app/utils/outbox.py
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.config import (
+    EMAIL_OUTBOX_POLL_SECONDS,
+    EMAIL_OUTBOX_BATCH_SIZE,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_RETRY_MAX_SECONDS,
+    NOTIFY_DIGEST_WINDOW_SECONDS,
+)
+from app.utils import email
+from app.utils.metrics import counter
+
+# a claimed message is retried by anyone after this long (worker crashed)
+CLAIM_LEASE = timedelta(minutes=5)
+
+sent_total = counter("email_outbox_sent_total", "Outbox messages delivered")
+failed_total = counter("email_outbox_failures_total", "Failed delivery attempts")
+dead_total = counter("email_outbox_dead_total", "Messages dead-lettered after the last retry")
+digests_total = counter("event_notification_emails_total", "Event change emails built from notices")
+coalesced_total = counter("event_notifications_coalesced_total", "Notices folded into another email")
+
+
+def enqueue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    text: str,
+    html: Optional[str] = None,
+) -> models.EmailOutbox:
+    """
+    Queue a message in the caller's transaction: it is delivered only if
+    that transaction commits. Call worker.wake() after the commit.
+    """
+    message = models.EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body_text=text,
+        body_html=html,
+    )
+    db.add(message)
+    return message
+
+
+def enqueue_invite_email(db: Session, to_email: str, invite_token: str) -> models.EmailOutbox:
+    subject, text, html = email.invite_email(invite_token)
+    return enqueue_email(db, to_email, subject, text, html)
+
+
+def enqueue_event_notifications(
+    db: Session,
+    event: models.Event,
+    action: str,
+    user_ids: Iterable[int],
+    changed_by: Optional[models.User] = None,
+):
+    """
+    Record an event change for each recipient in the caller's transaction.
+    Delivery (coalesced per recipient) is left to the worker, so the
+    request never waits for mail.
+    """
+    actor = changed_by and (changed_by.name or changed_by.email)
+    db.add_all([
+        models.EventNotification(
+            user_id=user_id,
+            event_id=event.id,
+            action=action,
+            title=event.title,
+            start_time=event.start_time,
+            end_time=event.end_time,
+            changed_by=actor,
+        )
+        for user_id in set(user_ids)
+        if not changed_by or user_id != changed_by.id
+    ])
+
+
+def flush_notifications(db: Session, window_seconds: float = NOTIFY_DIGEST_WINDOW_SECONDS) -> int:
+    """
+    Turn each recipient's notices into ONE outbox email once their oldest
+    notice is `window_seconds` old; later changes to the same event replace
+    earlier ones. Returns the number of emails queued.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=window_seconds)
+    due_users = (
+        select(models.EventNotification.user_id)
+        .group_by(models.EventNotification.user_id)
+        .having(func.min(models.EventNotification.created_at) <= cutoff)
+        .limit(EMAIL_OUTBOX_BATCH_SIZE)
+    )
+    rows = db.execute(
+        select(models.EventNotification, models.User.email)
+        .join(models.User, models.User.id == models.EventNotification.user_id)
+        .where(models.EventNotification.user_id.in_(due_users))
+        .order_by(models.EventNotification.user_id, models.EventNotification.id)
+        .with_for_update(of=models.EventNotification, skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+
+    by_user = {}
+    for notice, to_email in rows:
+        latest = by_user.setdefault(notice.user_id, (to_email, {}))[1]
+        # the last notice per event wins (e.g. updated then cancelled)
+        latest.pop(notice.event_id, None)
+        latest[notice.event_id] = notice
+
+    queued = 0
+    for to_email, latest in by_user.values():
+        if not to_email:
+            continue  # mobile-only account
+        subject, text = email.event_changes_email(list(latest.values()))
+        enqueue_email(db, to_email, subject, text)
+        queued += 1
+    digests_total.inc(queued)
+    coalesced_total.inc(len(rows) - queued)
+
+    db.execute(
+        delete(models.EventNotification).where(
+            models.EventNotification.id.in_([notice.id for notice, _ in rows])
+        )
+    )
+    db.commit()
+    return queued
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff with jitter: base * 2^(attempts-1), capped.
+    """
+    delay = min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def _claim_due(db: Session, limit: int):
+    """
+    Lock a batch of due messages (SKIP LOCKED: workers never share rows)
+    and push them out by CLAIM_LEASE, then commit the claim. Returns plain
+    rows: ORM instances would expire on that commit and reload one by one.
+    """
+    now = datetime.utcnow()
+    messages = db.execute(
+        select(
+            models.EmailOutbox.id,
+            models.EmailOutbox.to_email,
+            models.EmailOutbox.subject,
+            models.EmailOutbox.body_text,
+            models.EmailOutbox.body_html,
+            models.EmailOutbox.attempts,
+        )
+        .where(
+            models.EmailOutbox.status == "pending",
+            models.EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(models.EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if messages:
+        db.execute(
+            update(models.EmailOutbox)
+            .where(models.EmailOutbox.id.in_([m.id for m in messages]))
+            .values(next_attempt_at=now + CLAIM_LEASE)
+        )
+    db.commit()
+    return messages
+
+
+def deliver_due(db: Session, limit: int = EMAIL_OUTBOX_BATCH_SIZE, backend=None) -> int:
+    """
+    Send one batch of due messages over pooled connections; returns how
+    many were handled. A crash before the outcomes commit resends the batch
+    once its lease expires (delivery is at-least-once).
+    """
+    backend = backend or email.backend
+    messages = _claim_due(db, limit)
+    if not messages:
+        return 0
+
+    errors = backend.send_many([
+        email.Email(m.to_email, m.subject, m.body_text, m.body_html) for m in messages
+    ])
+
+    outcomes = []
+    for message, exc in zip(messages, errors):
+        outcome = {"id": message.id, "attempts": message.attempts + 1}
+        if exc is not None:
+            failed_total.inc()
+            outcome["last_error"] = f"{type(exc).__name__}: {exc}"
+            if outcome["attempts"] >= EMAIL_MAX_ATTEMPTS:
+                outcome["status"] = "dead"
+                dead_total.inc()
+                print(f"Email {message.id} to {message.to_email} dead-lettered: {outcome['last_error']}")
+            else:
+                outcome["next_attempt_at"] = datetime.utcnow() + retry_delay(outcome["attempts"])
+        else:
+            sent_total.inc()
+            outcome.update(status="sent", sent_at=datetime.utcnow(), last_error=None)
+        outcomes.append(outcome)
+    # ORM bulk UPDATE by primary key: one executemany per run of rows with
+    # the same columns, so rows are grouped by outcome first
+    outcomes.sort(key=sorted)
+    db.execute(update(models.EmailOutbox), outcomes)
+    db.commit()
+
+    return len(messages)
+
+
+class OutboxWorker:
+    """
+    Background thread draining the outbox. It polls every
+    EMAIL_OUTBOX_POLL_SECONDS; wake() skips the wait right after a commit.
+    """
+
+    def __init__(self, session_factory, poll_seconds: float = EMAIL_OUTBOX_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds + 5)
+            self._thread = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            try:
+                with self.session_factory() as db:
+                    flush_notifications(db)
+                    # keep going while full batches come back
+                    while (
+                        not self._stopping.is_set()
+                        and deliver_due(db) == EMAIL_OUTBOX_BATCH_SIZE
+                    ):
+                        pass
+            except Exception as exc:
+                print(f"Email outbox worker error: {exc}")
+            self._wakeup.wait(self.poll_seconds)
+
+
+# a plain thread, so it always uses the sync engine (even with DB_ASYNC)
+worker = OutboxWorker(SessionLocal)
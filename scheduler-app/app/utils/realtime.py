@@ -0,0 +1,132 @@
+# app/utils/realtime.py
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Iterable, Set, Tuple
+
+from app.config import REALTIME_BROKER_URL
+from app.utils.cache import blocking_io
+
+try:
+    import redis
+except ImportError:  # optional: only needed for cross-worker fan-out
+    redis = None
+
+CHANNEL = "scheduler:event-changes"
+
+
+class InProcessBroker:
+    """
+    Fans messages out to the sockets connected to THIS process.
+    Used on its own for a single worker and in tests.
+
+    publish() may be called from any thread (crud runs in the threadpool);
+    delivery is handed to each subscriber's event loop.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((queue, loop))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            for item in [s for s in subscribers if s[0] is queue]:
+                subscribers.discard(item)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_ids: Iterable[int], message: dict):
+        self._deliver(user_ids, message)
+
+    def _deliver(self, user_ids: Iterable[int], message: dict):
+        with self._lock:
+            targets = [
+                item
+                for user_id in set(user_ids)
+                for item in self._subscribers.get(user_id, ())
+            ]
+        for queue, loop in targets:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+
+def _offer(queue: asyncio.Queue, message: dict):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # slow client: it catches up through GET /events/changes
+        pass
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes through Redis pub/sub so every uvicorn worker receives each
+    message and delivers it to its own sockets.
+    """
+
+    def __init__(self, url: str, queue_size: int = 100):
+        super().__init__(queue_size)
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_ids: Iterable[int], message: dict):
+        # runs after the write committed: a lost push must not fail it
+        # (clients still catch up through GET /events/changes)
+        try:
+            blocking_io(
+                self._redis.publish,
+                CHANNEL,
+                json.dumps({"user_ids": list(user_ids), "message": message}),
+            )
+        except redis.RedisError as exc:
+            print(f"Realtime publish failed: {exc}")
+
+    def _listen(self, max_backoff: float = 30.0):
+        backoff = 1.0
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                backoff = 1.0
+                for item in pubsub.listen():
+                    data = json.loads(item["data"])
+                    self._deliver(data["user_ids"], data["message"])
+            except redis.RedisError as exc:
+                print(f"Realtime listener lost Redis ({exc}); retrying in {backoff:.0f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+
+
+def _make_broker():
+    if REALTIME_BROKER_URL:
+        if redis is None:
+            raise RuntimeError("REALTIME_BROKER_URL is set but the 'redis' package is not installed")
+        return RedisBroker(REALTIME_BROKER_URL)
+    return InProcessBroker()
+
+
+broker = _make_broker()
+
+
+def publish_event_change(user_ids: Iterable[int], event_id: int, action: str):
+    """
+    Tell connected clients an event changed; they pull it via /events/changes.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        broker.publish(user_ids, {"event_id": event_id, "action": action})
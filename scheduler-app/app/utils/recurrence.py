@@ -0,0 +1,237 @@
+# app/utils/recurrence.py
+from datetime import datetime, timedelta
+from functools import lru_cache
+from math import lcm
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+# period of one step, in days
+_FREQ_DAYS = {"DAILY": 1, "WEEKLY": 7}
+
+
+class Rule(NamedTuple):
+    """
+    The supported RRULE subset: FREQ=DAILY|WEEKLY, INTERVAL, BYDAY
+    (weekly only) and COUNT or UNTIL. Times are naive UTC.
+    """
+    freq: str
+    interval: int = 1
+    byday: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+
+
+class Occurrence(NamedTuple):
+    """
+    One expanded occurrence; duck-types models.Event for serialization.
+    `occurrence_start` is the rule's original start (the exception key).
+    """
+    id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+    user_id: int
+    status: str
+    participants: list
+    recurrence: str
+    occurrence_start: datetime
+
+
+def _positive_int(value: str, name: str) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return int(value)
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    try:
+        # a bare date includes that whole day
+        return datetime.strptime(value, "%Y%m%d") + timedelta(days=1, microseconds=-1)
+    except ValueError:
+        raise ValueError("UNTIL must look like 20260131 or 20260131T170000Z")
+
+
+def normalize_rule(text: str) -> str:
+    text = text.strip().upper()
+    return text[len("RRULE:"):] if text.startswith("RRULE:") else text
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(text: str) -> Rule:
+    """
+    "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10" -> Rule. Raises ValueError.
+    """
+    parts = {}
+    for part in normalize_rule(text).split(";"):
+        if not part:
+            continue
+        key, sep, value = part.partition("=")
+        if not sep or key in parts:
+            raise ValueError(f"Malformed rule part '{part}'")
+        parts[key] = value
+
+    unknown = parts.keys() - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+    if unknown:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unknown))}")
+
+    freq = parts.get("FREQ")
+    if freq not in _FREQ_DAYS:
+        raise ValueError("FREQ must be DAILY or WEEKLY")
+    interval = _positive_int(parts.get("INTERVAL", "1"), "INTERVAL")
+
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            byday = tuple(sorted({WEEKDAYS.index(day) for day in parts["BYDAY"].split(",")}))
+        except ValueError:
+            raise ValueError("BYDAY takes a list of MO,TU,WE,TH,FR,SA,SU")
+
+    count = until = None
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("COUNT and UNTIL are mutually exclusive")
+    if "COUNT" in parts:
+        count = _positive_int(parts["COUNT"], "COUNT")
+    if "UNTIL" in parts:
+        until = _parse_until(parts["UNTIL"])
+
+    return Rule(freq, interval, byday, count, until)
+
+
+class Series:
+    """
+    A recurring event: the first occurrence, its rule and the sparse
+    exceptions (cancelled or moved occurrences).
+
+    Occurrence n starts at anchor + k * period + offsets[j], so any
+    occurrence is found by arithmetic instead of stepping from the first
+    one; expanding a window costs only the occurrences inside it.
+    """
+
+    def __init__(
+        self,
+        event_id: int,
+        start: datetime,
+        end: datetime,
+        rule: Rule,
+        exceptions: Iterable = (),
+    ):
+        self.event_id = event_id
+        self.start = start
+        self.duration = end - start
+        self.rule = rule
+        self.period = timedelta(days=_FREQ_DAYS[rule.freq] * rule.interval)
+
+        if rule.freq == "WEEKLY":
+            # Monday of the first week, at the event's time of day
+            self.anchor = start - timedelta(days=start.weekday())
+            days = rule.byday or (start.weekday(),)
+            self.offsets = [timedelta(days=day) for day in days]
+        else:
+            self.anchor = start
+            self.offsets = [timedelta(0)]
+        # BYDAY days of the first week that fall before the first occurrence
+        self.skipped = sum(1 for off in self.offsets if self.anchor + off < start)
+
+        self.total = None
+        if rule.count:
+            self.total = rule.count
+        elif rule.until:
+            self.total = self._count_before(rule.until + timedelta(microseconds=1))
+        if self.total == 0:
+            raise ValueError("The recurrence rule yields no occurrences")
+
+        self.cancelled = set()
+        self.moved = {}  # original start -> (start, end, title)
+        for exc in exceptions:
+            if exc.cancelled:
+                self.cancelled.add(exc.occurrence_start)
+            else:
+                self.moved[exc.occurrence_start] = (exc.start_time, exc.end_time, exc.title)
+
+    def _start(self, n: int) -> datetime:
+        k, j = divmod(n + self.skipped, len(self.offsets))
+        return self.anchor + k * self.period + self.offsets[j]
+
+    def _count_before(self, t: datetime) -> int:
+        """
+        Number of rule occurrences starting before `t`.
+        """
+        if t <= self.start:
+            return 0
+        k = (t - self.anchor) // self.period
+        base = self.anchor + k * self.period
+        n = k * len(self.offsets) + sum(1 for off in self.offsets if base + off < t) - self.skipped
+        return n if self.total is None else min(n, self.total)
+
+    @property
+    def end(self) -> Optional[datetime]:
+        """
+        End of the last occurrence (moved ones included); None if unbounded.
+        """
+        if self.total is None:
+            return None
+        ends = [self._start(self.total - 1) + self.duration]
+        ends += [end for _, end, _ in self.moved.values()]
+        return max(ends)
+
+    def is_occurrence(self, t: datetime) -> bool:
+        n = self._count_before(t)
+        return (self.total is None or n < self.total) and self._start(n) == t
+
+    def occurrences(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime, datetime, Optional[str]]]:
+        """
+        Occurrences overlapping [start, end) as
+        (original start, start, end, title override), ordered by start.
+        """
+        result = []
+        n = self._count_before(start - self.duration)
+        while self.total is None or n < self.total:
+            s = self._start(n)
+            if s >= end:
+                break
+            if s + self.duration > start and s not in self.cancelled and s not in self.moved:
+                result.append((s, s, s + self.duration, None))
+            n += 1
+        for original, (s, e, title) in self.moved.items():
+            if s < end and e > start:
+                result.append((original, s, e, title))
+        result.sort(key=lambda occ: occ[1])
+        return result
+
+
+def first_clash(a: Series, b: Series) -> Optional[Tuple[datetime, datetime]]:
+    """
+    An occurrence of `b` that overlaps an occurrence of `a`, or None.
+
+    Both rules repeat every lcm(period_a, period_b), so only one cycle
+    after the later series starts has to be compared (plus one cycle per
+    exception, which can hide a clash for one repetition).
+    """
+    for s, e, _ in list(a.moved.values()):
+        hits = b.occurrences(s, e)
+        if hits:
+            return hits[0][1], hits[0][2]
+    for s, e, _ in list(b.moved.values()):
+        if a.occurrences(s, e):
+            return s, e
+
+    cycle = timedelta(days=lcm(a.period.days, b.period.days))
+    exceptions = len(a.cancelled) + len(a.moved) + len(b.cancelled) + len(b.moved)
+    begin = max(a.start, b.start) - max(a.duration, b.duration)
+    stop = begin + cycle * (exceptions + 2) + a.duration + b.duration
+    for series_end in (a.end, b.end):
+        if series_end is not None:
+            stop = min(stop, series_end)
+
+    for _, s, e, _ in a.occurrences(begin, stop):
+        hits = b.occurrences(s, e)
+        if hits:
+            return hits[0][1], hits[0][2]
+    return None
@@ -0,0 +1,109 @@
+# app/utils/slots.py
+import heapq
+from datetime import datetime, time, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+Interval = Tuple[datetime, datetime]
+
+
+class WorkingHours(NamedTuple):
+    """
+    Daily [start, end) window on `weekdays` (0 = Monday) in `timezone`.
+    """
+    start: time
+    end: time
+    weekdays: Sequence[int]
+    timezone: str = "UTC"
+
+
+def free_windows(busy_lists: Iterable[List[Interval]], start: datetime, end: datetime) -> Iterator[Interval]:
+    """
+    k-way sweep: merge every user's sorted busy intervals (heap of list
+    heads, O(n log k)) and yield the gaps inside [start, end) where nobody
+    is busy. Intervals may carry extra fields after (start, end).
+    """
+    cursor = start
+    for busy_start, busy_end, *_ in heapq.merge(*busy_lists):
+        if busy_start > cursor:
+            yield cursor, min(busy_start, end)
+        if busy_end > cursor:
+            cursor = busy_end
+        if cursor >= end:
+            return
+    if cursor < end:
+        yield cursor, end
+
+
+def working_windows(start: datetime, end: datetime, hours: WorkingHours) -> Iterator[Interval]:
+    """
+    Working-hour windows intersecting [start, end), as naive UTC.
+    """
+    zone = ZoneInfo(hours.timezone)
+    utc = ZoneInfo("UTC")
+    day = start.replace(tzinfo=utc).astimezone(zone).date() - timedelta(days=1)
+    last = end.replace(tzinfo=utc).astimezone(zone).date()
+    while day <= last:
+        if day.weekday() in hours.weekdays:
+            opens = datetime.combine(day, hours.start, zone).astimezone(utc).replace(tzinfo=None)
+            closes = datetime.combine(day, hours.end, zone).astimezone(utc).replace(tzinfo=None)
+            if opens < end and closes > start:
+                yield max(opens, start), min(closes, end)
+        day += timedelta(days=1)
+
+
+def intersect(a: Iterable[Interval], b: Iterable[Interval]) -> Iterator[Interval]:
+    """
+    Overlaps of two sorted, disjoint interval streams (two pointers).
+    """
+    a, b = iter(a), iter(b)
+    x, y = next(a, None), next(b, None)
+    while x and y:
+        lo, hi = max(x[0], y[0]), min(x[1], y[1])
+        if lo < hi:
+            yield lo, hi
+        if x[1] <= y[1]:
+            x = next(a, None)
+        else:
+            y = next(b, None)
+
+
+def _align(value: datetime, step: timedelta, timezone: str = "UTC") -> datetime:
+    """
+    Round naive-UTC `value` up to the step grid (e.g. :00/:15/:30/:45 for
+    15 minutes) of the wall clock in `timezone`, so hourly slots in
+    Asia/Kolkata (+05:30) start on the local hour.
+    """
+    offset = value.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo(timezone)).utcoffset()
+    return value + (-(value + offset - datetime.min) % step)
+
+
+def find_slots(
+    busy_lists: Iterable[List[Interval]],
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+    k: int,
+    step: timedelta,
+    hours: Optional[WorkingHours] = None,
+) -> List[Interval]:
+    """
+    The k earliest [s, s + duration) slots, s on the step grid, where
+    every list is free. Stops as soon as k slots are found. With working
+    hours the grid follows their timezone's wall clock, otherwise UTC.
+    """
+    windows = free_windows(busy_lists, start, end)
+    timezone = "UTC"
+    if hours:
+        windows = intersect(windows, working_windows(start, end, hours))
+        timezone = hours.timezone
+
+    slots = []
+    for window_start, window_end in windows:
+        slot = _align(window_start, step, timezone)
+        while slot + duration <= window_end:
+            slots.append((slot, slot + duration))
+            if len(slots) == k:
+                return slots
+            slot += step
+    return slots
@@ -0,0 +1,16 @@
+import os
+
+# app.database builds its engines at import time (nothing connects until a
+# query runs); unit tests only need the settings to be present
+for name, value in {
+    "DB_USER": "scheduler",
+    "DB_PASSWORD": "scheduler",
+    "DB_HOST": "localhost",
+    "DB_NAME": "scheduler_test",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "EMAIL_BACKEND": "memory",
+    "EMAIL_OUTBOX_WORKER": "false",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app import crud, schemas
+from app.utils.autoschedule import Meeting, place_meetings
+from app.utils.busy_index import UserIntervals
+
+
+def at(day: int, hour: int = 9) -> datetime:
+    return datetime(2026, 1, day, hour)
+
+
+ALICE = SimpleNamespace(id=1, name="Alice", role=None)
+STANDUP = SimpleNamespace(
+    id=10,
+    start_time=at(5),
+    end_time=at(5, 10),
+    recurrence="FREQ=DAILY;COUNT=5",
+    exceptions=[],
+)
+
+
+def busy_with_standup(monkeypatch) -> dict:
+    """
+    _batch_busy for Alice, whose only commitment is a 5-day daily series.
+    """
+    monkeypatch.setattr(crud, "_db_conflicts", lambda *args, **kwargs: {})
+    monkeypatch.setattr(crud, "_active_series", lambda *args, **kwargs: [(STANDUP, {ALICE.id})])
+    return crud._batch_busy(None, [ALICE.id], at(1), at(31))
+
+
+# ---------- UserIntervals ----------
+
+def test_set_event_keeps_every_interval_of_the_event():
+    entry = UserIntervals(0)
+    entry.set_event(10, [(at(5), at(5, 10)), (at(6), at(6, 10))])
+    assert entry.overlapping(at(5), at(5, 10)) == [(at(5), at(5, 10), 10)]
+    assert entry.overlapping(at(6), at(6, 10)) == [(at(6), at(6, 10), 10)]
+
+
+def test_add_replaces_the_event_and_remove_drops_all_of_it():
+    entry = UserIntervals(0)
+    entry.set_event(10, [(at(5), at(5, 10)), (at(6), at(6, 10))])
+    entry.add(at(7), at(7, 10), 10)
+    assert entry.items == [(at(7), at(7, 10), 10)]
+    entry.remove(10)
+    assert entry.items == [] and entry.starts == []
+
+
+# ---------- batch checks against recurring events ----------
+
+def test_batch_busy_keeps_every_occurrence_of_a_series(monkeypatch):
+    busy = busy_with_standup(monkeypatch)
+    for day in range(5, 10):
+        assert busy[ALICE.id].overlapping(at(day), at(day, 10)) == [(at(day), at(day, 10), STANDUP.id)]
+    assert busy[ALICE.id].overlapping(at(10), at(10, 10)) == []
+
+
+def test_bulk_items_over_any_occurrence_are_rejected(monkeypatch):
+    busy = busy_with_standup(monkeypatch)
+    items = [
+        schemas.EventCreate(title="clash", start_time=at(5, 9) + timedelta(minutes=30), end_time=at(5, 11)),
+        schemas.EventCreate(title="free", start_time=at(10), end_time=at(10, 10)),
+    ]
+    results = crud._check_batch(items, ALICE, {}, busy)
+    assert [r["status"] for r in results] == ["conflict", "created"]
+    assert results[0]["detail"][0]["events"][0]["id"] == STANDUP.id
+
+
+def test_auto_schedule_places_around_every_occurrence(monkeypatch):
+    busy = busy_with_standup(monkeypatch)
+    meetings = [
+        Meeting(title=f"day {day}", user_ids=[ALICE.id], duration=timedelta(hours=1), start=at(day), end=at(day, 11))
+        for day in range(5, 10)
+    ]
+    placed = place_meetings(meetings, busy, timedelta(minutes=30))
+    assert placed == [(at(day, 10), at(day, 11)) for day in range(5, 10)]
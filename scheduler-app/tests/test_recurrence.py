@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import pytest
+
+from app.utils.recurrence import Series, first_clash, parse_rule
+
+
+class Exc(NamedTuple):
+    """Stands in for models.EventException."""
+    occurrence_start: datetime
+    cancelled: bool = False
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    title: Optional[str] = None
+
+
+def at(day: int, hour: int = 9) -> datetime:
+    # January 2026; the 5th is a Monday
+    return datetime(2026, 1, day, hour)
+
+
+def series(rule: str, start: datetime, hours: int = 1, exceptions=(), event_id: int = 1) -> Series:
+    return Series(event_id, start, start + timedelta(hours=hours), parse_rule(rule), exceptions)
+
+
+def starts(s: Series, start: datetime, end: datetime) -> list:
+    return [occ[1] for occ in s.occurrences(start, end)]
+
+
+# ---------- parse_rule ----------
+
+def test_parse_rule_reads_the_supported_subset():
+    rule = parse_rule("RRULE:freq=weekly;interval=2;byday=WE,MO;count=6")
+    assert (rule.freq, rule.interval, rule.byday, rule.count, rule.until) == ("WEEKLY", 2, (0, 2), 6, None)
+
+
+@pytest.mark.parametrize("text", [
+    "FREQ=MONTHLY",
+    "FREQ=DAILY;BYDAY=MO",
+    "FREQ=DAILY;COUNT=2;UNTIL=20260110",
+    "FREQ=DAILY;COUNT=0",
+    "FREQ=WEEKLY;BYDAY=XX",
+    "FREQ=DAILY;BYHOUR=9",
+])
+def test_parse_rule_rejects_unsupported_rules(text):
+    with pytest.raises(ValueError):
+        parse_rule(text)
+
+
+# ---------- Series ----------
+
+def test_daily_count_expands_every_day_and_ends_after_the_last():
+    s = series("FREQ=DAILY;COUNT=5", at(5))
+    assert starts(s, at(1), at(31)) == [at(5), at(6), at(7), at(8), at(9)]
+    assert s.end == at(9, 10)
+
+
+def test_weekly_byday_skips_days_before_the_first_occurrence():
+    # starts on Wednesday the 7th: Monday the 5th is not an occurrence
+    s = series("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3", at(7))
+    assert starts(s, at(1), at(31)) == [at(7), at(12), at(14)]
+    assert s.end == at(14, 10)
+
+
+def test_until_date_includes_that_whole_day():
+    s = series("FREQ=DAILY;UNTIL=20260107", at(5))
+    assert starts(s, at(1), at(31)) == [at(5), at(6), at(7)]
+
+
+def test_unbounded_series_has_no_end_and_expands_any_window():
+    s = series("FREQ=WEEKLY;INTERVAL=2", at(5))
+    assert s.end is None
+    assert starts(s, datetime(2027, 1, 1), datetime(2027, 1, 31)) == [
+        datetime(2027, 1, 4, 9), datetime(2027, 1, 18, 9),
+    ]
+
+
+def test_occurrences_include_one_already_running_at_the_window_start():
+    s = series("FREQ=DAILY", at(5), hours=2)
+    assert starts(s, at(6, 10), at(6, 12)) == [at(6)]
+
+
+def test_is_occurrence_follows_the_rule_and_count():
+    s = series("FREQ=DAILY;COUNT=3", at(5))
+    assert s.is_occurrence(at(6))
+    assert not s.is_occurrence(at(6, 10))
+    assert not s.is_occurrence(at(8))
+
+
+def test_exceptions_cancel_and_move_single_occurrences():
+    s = series(
+        "FREQ=DAILY;COUNT=3",
+        at(5),
+        exceptions=[
+            Exc(at(6), cancelled=True),
+            Exc(at(7), start_time=at(8, 14), end_time=at(8, 15), title="Moved"),
+        ],
+    )
+    assert s.occurrences(at(1), at(31)) == [
+        (at(5), at(5), at(5, 10), None),
+        (at(7), at(8, 14), at(8, 15), "Moved"),
+    ]
+    # a moved occurrence can extend the series
+    assert s.end == at(8, 15)
+
+
+# ---------- first_clash ----------
+
+def test_first_clash_finds_a_shared_occurrence():
+    daily = series("FREQ=DAILY", at(5), event_id=1)
+    weekly = series("FREQ=WEEKLY;BYDAY=TH", at(5, 9) + timedelta(minutes=30), event_id=2)
+    assert first_clash(daily, weekly) == (at(8, 9) + timedelta(minutes=30), at(8, 10) + timedelta(minutes=30))
+
+
+def test_first_clash_is_none_for_disjoint_days_or_times():
+    mondays = series("FREQ=WEEKLY;BYDAY=MO", at(5), event_id=1)
+    tuesdays = series("FREQ=WEEKLY;BYDAY=TU", at(6), event_id=2)
+    afternoons = series("FREQ=DAILY", at(5, 14), event_id=3)
+    assert first_clash(mondays, tuesdays) is None
+    assert first_clash(mondays, afternoons) is None
+
+
+def test_first_clash_is_none_when_one_series_ends_before_the_other_starts():
+    early = series("FREQ=DAILY;COUNT=3", at(5), event_id=1)
+    late = series("FREQ=DAILY", at(12), event_id=2)
+    assert first_clash(early, late) is None
+
+
+def test_first_clash_sees_a_moved_occurrence():
+    mondays = series("FREQ=WEEKLY;BYDAY=MO", at(5), event_id=1)
+    tuesdays = series(
+        "FREQ=WEEKLY;BYDAY=TU",
+        at(6),
+        exceptions=[Exc(at(13), start_time=at(12), end_time=at(12, 10))],
+        event_id=2,
+    )
+    assert first_clash(mondays, tuesdays) == (at(12), at(12, 10))
+
+
+def test_first_clash_skips_a_cancelled_occurrence():
+    once = series("FREQ=DAILY;COUNT=1", at(7), event_id=1)
+    daily = series("FREQ=DAILY", at(5), exceptions=[Exc(at(7), cancelled=True)], event_id=2)
+    assert first_clash(once, daily) is None
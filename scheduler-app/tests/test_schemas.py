@@ -0,0 +1,26 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from app import schemas
+
+REVERSED = {"title": "x", "start_time": "2026-01-05T10:00:00Z", "end_time": "2026-01-05T09:00:00Z"}
+
+
+@pytest.mark.parametrize("schema", [schemas.EventCreate, schemas.OccurrenceUpdate])
+def test_event_times_must_be_in_order(schema):
+    with pytest.raises(ValidationError, match="end_time must be after start_time"):
+        schema(**REVERSED)
+    with pytest.raises(ValidationError):
+        schema(**{**REVERSED, "end_time": REVERSED["start_time"]})
+
+
+def test_bulk_items_leave_time_order_to_the_per_item_check():
+    item = schemas.EventBulkItem(**REVERSED)
+    assert item.end_time < item.start_time
+
+
+def test_times_are_stored_as_naive_utc():
+    event = schemas.EventCreate(title="x", start_time="2026-01-05T09:00:00+05:30", end_time="2026-01-05T10:00:00+05:30")
+    assert event.start_time == datetime(2026, 1, 5, 3, 30)
@@ -0,0 +1,43 @@
+from datetime import datetime, time, timedelta
+
+from app.utils.slots import WorkingHours, find_slots
+
+HOUR = timedelta(hours=1)
+WEEKDAYS = range(5)
+
+
+def at(day: int, hour: int = 0, minute: int = 0) -> datetime:
+    # naive UTC, January 2026; the 5th is a Monday
+    return datetime(2026, 1, day, hour, minute)
+
+
+def test_slots_without_working_hours_sit_on_the_utc_grid():
+    busy = [[(at(5, 9), at(5, 9, 10))]]
+    assert find_slots(busy, at(5, 9), at(5, 12), HOUR, 2, HOUR) == [
+        (at(5, 10), at(5, 11)),
+        (at(5, 11), at(5, 12)),
+    ]
+
+
+def test_slots_follow_the_local_hour_in_a_half_hour_offset_zone():
+    # 09:00-17:00 Asia/Kolkata is 03:30-11:30 UTC
+    hours = WorkingHours(time(9), time(17), WEEKDAYS, "Asia/Kolkata")
+    assert find_slots([[]], at(5), at(6), HOUR, 2, HOUR, hours) == [
+        (at(5, 3, 30), at(5, 4, 30)),
+        (at(5, 4, 30), at(5, 5, 30)),
+    ]
+
+
+def test_local_grid_applies_after_a_busy_interval():
+    hours = WorkingHours(time(9), time(17), WEEKDAYS, "Asia/Kolkata")
+    busy = [[(at(5, 3, 30), at(5, 4, 40))]]
+    # free from 10:10 local: next local hour is 11:00 (05:30 UTC)
+    assert find_slots(busy, at(5), at(6), HOUR, 1, HOUR, hours) == [(at(5, 5, 30), at(5, 6, 30))]
+
+
+def test_quarter_hour_steps_in_a_dst_zone():
+    # 09:00 New York is 14:00 UTC in January
+    hours = WorkingHours(time(9), time(17), WEEKDAYS, "America/New_York")
+    step = timedelta(minutes=15)
+    busy = [[(at(5, 14), at(5, 14, 5))]]
+    assert find_slots(busy, at(5), at(6), HOUR, 1, step, hours) == [(at(5, 14, 15), at(5, 15, 15))]
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import FullCalendar from '@fullcalendar/react';
 import dayGridPlugin from '@fullcalendar/daygrid';
 import timeGridPlugin from '@fullcalendar/timegrid';
@@ -41,6 +41,9 @@ const Dashboard: React.FC = () => {
     const [selectedEvent, setSelectedEvent] = useState<any>(null);
     const [isProfileOpen, setIsProfileOpen] = useState(false);
 
+    // Range FullCalendar is currently showing; events are fetched per range
+    const visibleRange = useRef<{ start: Date; end: Date } | null>(null);
+
     const token = localStorage.getItem('token');
 
     // ─────────── FETCH CURRENT USER ─────────── //
@@ -57,29 +60,84 @@ const Dashboard: React.FC = () => {
     }, []);
 
     // ─────────── FETCH EVENTS ─────────── //
+    const mapEvent = (e: any) => ({
+        id: e.id,
+        title: e.title,
+        start: e.start_time,
+        end: e.end_time,
+        extendedProps: {
+            status: e.status,
+            participants: e.participants,
+            recurrence: e.recurrence,
+            occurrence_start: e.occurrence_start,
+        },
+        classNames: e.status === 'cancelled' ? ['cancelled-event'] : [],
+    });
+
+    // One occurrence of a recurring event is edited/cancelled on its own;
+    // the plain event path would apply to the whole series
+    const eventPath = (ev: any) => {
+        const occurrenceStart = ev.extendedProps?.occurrence_start;
+        return occurrenceStart
+            ? `/events/${ev.id}/occurrences/${encodeURIComponent(occurrenceStart)}`
+            : `/events/${ev.id}`;
+    };
+
+    // Change-log cursor; after writes only the delta since it is fetched
+    const changeCursor = useRef<number | null>(null);
+
     const fetchEvents = async () => {
+        if (!visibleRange.current) return;
+        try {
+            // take the cursor first so nothing written meanwhile is missed
+            const cursorRes = await api.get('/events/changes');
+            const res = await api.get('/events/', {
+                params: {
+                    start: visibleRange.current.start.toISOString(),
+                    end: visibleRange.current.end.toISOString(),
+                },
+            });
+            changeCursor.current = cursorRes.data.cursor;
+            setEvents(res.data.map(mapEvent));
+        } catch {
+            message.error('Failed to load events');
+        }
+    };
+
+    const fetchChanges = async () => {
+        if (changeCursor.current === null || !visibleRange.current) return fetchEvents();
         try {
-            const res = await api.get('/events/');
-            const mappedEvents = res.data.map((e: any) => ({
-                id: e.id,
-                title: e.title,
-                start: e.start_time,
-                end: e.end_time,
-                extendedProps: {
-                    status: e.status,
-                    participants: e.participants,
+            // with the range, a changed series comes back as its occurrences
+            const res = await api.get('/events/changes', {
+                params: {
+                    since: changeCursor.current,
+                    start: visibleRange.current.start.toISOString(),
+                    end: visibleRange.current.end.toISOString(),
                 },
-                classNames: e.status === 'cancelled' ? ['cancelled-event'] : [],
-            }));
-            setEvents(mappedEvents);
+            });
+            changeCursor.current = res.data.cursor;
+            const changed = new Set<number>(res.data.updated);
+            const removed = new Set<number>(res.data.removed);
+            setEvents((prev) => [
+                ...prev.filter((e) => !changed.has(e.id) && !removed.has(e.id)),
+                ...res.data.events.map(mapEvent),
+            ]);
         } catch {
             message.error('Failed to load events');
         }
     };
 
+    // ─────────── LIVE UPDATES ─────────── //
+    // The server pushes {event_id, action}; we pull the delta right away
+    const fetchChangesRef = useRef(fetchChanges);
+    fetchChangesRef.current = fetchChanges;
+
     useEffect(() => {
-        fetchEvents();
-    }, []);
+        if (!token) return;
+        const ws = new WebSocket(`ws://localhost:8000/ws/events?token=${token}`);
+        ws.onmessage = () => fetchChangesRef.current();
+        return () => ws.close();
+    }, [token]);
 
     // ─────────── FETCH USERS ─────────── //
     const fetchUsers = async () => {
@@ -142,16 +200,20 @@ const Dashboard: React.FC = () => {
                 minute: values.end.minute(),
             });
 
-            const payload = {
+            const times = {
                 title: values.title,
                 start_time: start.toISOString(),
                 end_time: end.toISOString(),
-                participants: values.participants || [],
             };
+            const payload = { ...times, participants: values.participants || [] };
 
             // 🔥 THIS IS THE CORE CHANGE
             if (isEditMode && selectedEvent) {
-                await api.put(`/events/${selectedEvent.id}`, payload);
+                // an occurrence takes only title and times
+                await api.put(
+                    eventPath(selectedEvent),
+                    selectedEvent.extendedProps?.occurrence_start ? times : payload
+                );
                 message.success('Event updated successfully!');
             } else {
                 await api.post('/events/', payload);
@@ -162,11 +224,13 @@ const Dashboard: React.FC = () => {
             setIsEditMode(false);
             setSelectedEvent(null);
             form.resetFields();
-            fetchEvents();
+            fetchChanges();
 
         } catch (err: any) {
+            // conflicts come back as { message, conflicts: [...] }
+            const detail = err?.response?.data?.detail;
             const apiMsg =
-                err?.response?.data?.detail ??
+                (typeof detail === 'string' ? detail : detail?.message) ??
                 (isEditMode ? 'Failed to update event' : 'Failed to create event');
 
             setFormError(apiMsg);
@@ -256,6 +320,10 @@ const Dashboard: React.FC = () => {
                     initialView={calendarView}
                     events={events}
                     dateClick={onDateClick}
+                    datesSet={(arg) => {
+                        visibleRange.current = { start: arg.start, end: arg.end };
+                        fetchEvents();
+                    }}
                     height="auto"
                     key={calendarView}
 
@@ -335,10 +403,10 @@ const Dashboard: React.FC = () => {
                                     <Button
                                         danger
                                         onClick={async () => {
-                                            await api.delete(`/events/${selectedEvent.id}`);
+                                            await api.delete(eventPath(selectedEvent));
                                             message.success('Event cancelled');
                                             setIsPreviewOpen(false);
-                                            fetchEvents();
+                                            fetchChanges();
                                         }}
                                     >
                                         Cancel Event